@@ -12,10 +12,34 @@ import sys
 import argparse
 import json
 import logging
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
+import heapq
+import stat
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from copy import deepcopy
+from dataclasses import dataclass, asdict, field, fields, make_dataclass, replace
+from types import MappingProxyType
+from functools import lru_cache
+from json.encoder import encode_basestring
 from enum import Enum
 
+from potato_cache import DEFAULT_CACHE_SIZE, cached_export
+
+
+# Bump whenever a change to the renderer alters exported output, so cached
+# exports from older versions are not reused
+RENDERER_VERSION = "1"
+
+# Settings that never change what an export contains
+EXPORT_IGNORED_FIELDS = ("output_format", "output_file", "show_colors", "compare_varieties",
+                         "planting_interval", "loop", "max_cycles", "status_file",
+                         "slow_write_threshold", "export_cache_dir", "export_cache_size",
+                         "force_export", "shared_cache", "state_store", "run_id",
+                         "checkpoint_interval")
+
+# Settings that only matter to exports that play the animation back over time
+EXPORT_TIMING_FIELDS = ("growth_speed",)
+TIMED_EXPORT_KINDS = ("svg", "html")
+
 
 class GrowthStage(Enum):
     """Potato growth stages"""
@@ -40,19 +64,368 @@ class PotatoConfig:
     canvas_width: int = 40
     canvas_height: int = 20
     variety: str = "russet"
+    variety_params: Optional[Dict[str, Any]] = None  # e.g. scale, seed for "procedural"
     show_colors: bool = True
-    output_format: str = "terminal"  # terminal, file, both
+    output_format: str = "terminal"  # terminal, file, both, svg, html, ndjson
     output_file: Optional[str] = None
+    compare_varieties: Optional[List[str]] = None  # render these side by side
+    slow_write_threshold: float = 0.05  # seconds per frame write before backing off
+    planting_interval: Optional[float] = None  # stagger compared plants by this many seconds
+    loop: bool = False  # repeat the animation until stopped
+    max_cycles: Optional[int] = None  # stop looping after this many passes
+    status_file: Optional[str] = None  # JSON status written while looping
+    export_cache_dir: Optional[str] = None  # reuse unchanged exports from this cache
+    export_cache_size: int = DEFAULT_CACHE_SIZE  # bytes kept before evicting
+    force_export: bool = False  # re-render exports even on a cache hit
+    shared_cache: Optional[str] = None  # share rendered frames with other local players
+    state_store: Optional[str] = None  # SQLite file for checkpoints and stage history
+    run_id: str = "default"  # names the run inside the state store
+    checkpoint_interval: float = 10.0  # simulated seconds between checkpoints
+
+
+# Read-only snapshot of a PotatoConfig, as kept by the rendering engines
+FrozenPotatoConfig = make_dataclass("FrozenPotatoConfig",
+                                    [(f.name, f.type) for f in fields(PotatoConfig)],
+                                    frozen=True)
+
+
+def config_dict(config) -> Dict[str, Any]:
+    """Plain, JSON-serialisable deep copy of a live or frozen config"""
+    values = {f.name: getattr(config, f.name) for f in fields(PotatoConfig)}
+    if values["variety_params"] is not None:
+        values["variety_params"] = dict(values["variety_params"])
+    if values["compare_varieties"] is not None:
+        values["compare_varieties"] = list(values["compare_varieties"])
+    return deepcopy(values)
+
+
+def freeze_config(config) -> FrozenPotatoConfig:
+    """Snapshot a config so that nothing in it can be changed, not even in place"""
+    values = config_dict(config)
+    if values["variety_params"] is not None:
+        values["variety_params"] = MappingProxyType(values["variety_params"])
+    if values["compare_varieties"] is not None:
+        values["compare_varieties"] = tuple(values["compare_varieties"])
+    return FrozenPotatoConfig(**values)
+
+
+# Output formats a staggered field can be shown in
+SCHEDULER_FORMATS = ("terminal", "file", "both", "ndjson")
+
+# Output formats the looping daemon can stream
+LOOP_FORMATS = ("terminal", "ndjson")
+
+# Only flowers, leaves, and stems should be above ground
+ABOVE_GROUND_CHARS = "❀✿❋✾\\|/─━┬┼╷│║┃┏┓╔╗╭╮"
+
+
+@lru_cache(maxsize=64)
+def build_soil_rows(width: int, height: int) -> Tuple[str, ...]:
+    """Build the empty sky and soil background rows for a canvas size"""
+    soil_line = height - 8
+    rows = []
+    for row in range(height):
+        if row == soil_line:
+            # Surface soil line
+            line = "".join("~" if col % 2 == 0 else "-" for col in range(width))
+        elif row > soil_line and row <= soil_line + 2:
+            # Upper soil layer (loose topsoil)
+            char_types = ["▒", "░", "▓"]
+            line = "".join(char_types[(col + row) % 3] for col in range(width))
+        elif row > soil_line + 2:
+            # Lower soil layer (dense subsoil)
+            char_types = ["█", "▓", "▒"]
+            line = "".join(char_types[(col + row * 2) % 3] for col in range(width))
+        else:
+            line = " " * width
+        rows.append(line)
+    return tuple(rows)
+
+
+@lru_cache(maxsize=64)
+def encode_soil_rows(width: int, height: int) -> Tuple[bytes, ...]:
+    """UTF-8 encoded copy of the background rows for a canvas size"""
+    return tuple(row.encode('utf-8') for row in build_soil_rows(width, height))
+
+
+def layout_sprite(pattern: List[str], width: int, height: int) -> Dict[int, List[Tuple[int, str]]]:
+    """Place a pattern on a canvas and split it into opaque runs per row
+    
+    Spaces inside the pattern are transparent, so each pattern line becomes
+    a sorted list of (column, text) runs of non-space characters, clipped to
+    the canvas.
+    """
+    rows: Dict[int, List[Tuple[int, str]]] = {}
+    if not pattern:
+        return rows
+    
+    soil_line = height - 8
+    # Find the longest line for centering
+    max_pattern_width = max(len(line) for line in pattern)
+    start_col = width // 2 - max_pattern_width // 2
+    
+    # Position pattern so foliage is above ground and tubers create underground mound
+    above_ground_lines = 0
+    for line in pattern:
+        if any(c in ABOVE_GROUND_CHARS for c in line):
+            above_ground_lines += 1
+        else:
+            break  # Stop counting when we hit underground parts
+    start_row = soil_line - above_ground_lines + 1
+    
+    for i, pattern_line in enumerate(pattern):
+        row = start_row + i
+        if not 0 <= row < height:
+            continue
+        line_start_col = start_col + (max_pattern_width - len(pattern_line)) // 2
+        runs = []
+        run_start = None
+        for j, char in enumerate(pattern_line + " "):
+            col = line_start_col + j
+            opaque = char != " " and 0 <= col < width
+            if opaque and run_start is None:
+                run_start = j
+            elif not opaque and run_start is not None:
+                runs.append((line_start_col + run_start, pattern_line[run_start:j]))
+                run_start = None
+        if runs:
+            rows[row] = runs
+    return rows
+
+
+def compose_row(background: str, runs: List[Tuple[int, str]]) -> str:
+    """Overlay sorted, non-overlapping (column, text) runs onto a background row"""
+    pieces = []
+    pos = 0
+    for col, text in runs:
+        pieces.append(background[pos:col])
+        pieces.append(text)
+        pos = col + len(text)
+    pieces.append(background[pos:])
+    return "".join(pieces)
+
+
+ANSI_CLEAR = "\033[H\033[2J"
+
+
+def output_queue_bytes(stream) -> int:
+    """Return how many bytes are still queued behind a stream, or 0 if unknown
+    
+    Terminals report their pending output queue and pipes report the unread
+    bytes sitting in the pipe buffer; anything else is treated as empty.
+    """
+    try:
+        import fcntl
+        import termios
+        import array
+        fd = stream.fileno()
+        if os.isatty(fd):
+            request = termios.TIOCOUTQ
+        elif stat.S_ISFIFO(os.fstat(fd).st_mode):
+            request = termios.FIONREAD
+        else:
+            return 0
+        buf = array.array('i', [0])
+        fcntl.ioctl(fd, request, buf, True)
+        return buf[0]
+    except (ImportError, AttributeError, OSError, ValueError):
+        return 0
+
+
+@dataclass
+class PacingMetrics:
+    """Counters describing how the frame pacer reacted to the output"""
+    frames_written: int = 0
+    frames_skipped: int = 0
+    full_frames: int = 0
+    diff_frames: int = 0
+    late_frames: int = 0
+    bytes_written: int = 0
+    write_time: float = 0.0
+    max_write_latency: float = 0.0
+    max_queued_bytes: int = 0
+    interval: float = 0.0
+    mode: str = "full"
+
+
+class FramePacer:
+    """Writes frames to a stream and adapts when the stream is slow
+    
+    Every write is timed and the stream's output queue is sampled. Once a
+    write takes longer than the threshold or bytes pile up behind the
+    stream, the pacer switches to diff output (only changed rows are
+    redrawn), stretches the frame interval by the observed write latency
+    and drops frames that are not keyframes. Keyframes are always written.
+    Full frames resume once writes are fast again.
+    """
+    
+    def __init__(self, stream, interval: float, slow_write_threshold: float = 0.05,
+                 queue_threshold: int = 4096):
+        self.stream = stream
+        self.base_interval = interval
+        self.slow_write_threshold = slow_write_threshold
+        self.queue_threshold = queue_threshold
+        self.metrics = PacingMetrics(interval=interval)
+        self.backpressure = False
+        self._previous: Optional[List[str]] = None
+        self._deadline: Optional[float] = None
+    
+    def write_frame(self, rows: List[str], keyframe: bool = True) -> bool:
+        """Write a frame made of rows; returns False if the frame was skipped"""
+        if not keyframe and self.backpressure:
+            self.metrics.frames_skipped += 1
+            return False
+        
+        previous = self._previous
+        if self.metrics.mode == "diff" and previous is not None and len(previous) == len(rows):
+            parts = [f"\033[{i + 1};1H{row}\033[K" for i, (row, old) in enumerate(zip(rows, previous))
+                     if row != old]
+            parts.append(f"\033[{len(rows) + 1};1H")
+            data = "".join(parts)
+            self.metrics.diff_frames += 1
+        else:
+            data = ANSI_CLEAR + "\n".join(rows) + "\n"
+            self.metrics.full_frames += 1
+        
+        start = time.perf_counter()
+        self.stream.write(data)
+        self.stream.flush()
+        self._previous = rows
+        self._record(len(data), time.perf_counter() - start)
+        return True
+    
+    def write_encoded_frame(self, header: List[str], canvas: memoryview, footer: List[str],
+                            keyframe: bool = True) -> bool:
+        """Write a full frame whose canvas rows are already UTF-8 encoded
+        
+        The canvas (such as a shared-memory frame) goes straight to the
+        stream's byte buffer without being decoded. In diff mode, or on a
+        stream without a byte buffer, it is decoded and written as rows.
+        """
+        buffer = getattr(self.stream, "buffer", None)
+        if buffer is None or self.metrics.mode == "diff":
+            return self.write_frame([*header, *str(canvas, "utf-8").split("\n"), *footer], keyframe)
+        if not keyframe and self.backpressure:
+            self.metrics.frames_skipped += 1
+            return False
+        
+        head = (ANSI_CLEAR + "".join(row + "\n" for row in header)).encode("utf-8")
+        tail = "".join("\n" + row for row in footer).encode("utf-8") + b"\n"
+        self.metrics.full_frames += 1
+        start = time.perf_counter()
+        self.stream.flush()
+        buffer.write(head)
+        buffer.write(canvas)
+        buffer.write(tail)
+        buffer.flush()
+        self._previous = None  # the next diff has nothing decoded to compare against
+        self._record(len(head) + len(canvas) + len(tail), time.perf_counter() - start)
+        return True
+    
+    def _record(self, size: int, latency: float):
+        """Update the metrics for a written frame and adapt to the stream"""
+        queued = output_queue_bytes(self.stream)
+        self.metrics.frames_written += 1
+        self.metrics.bytes_written += size
+        self.metrics.write_time += latency
+        self.metrics.max_write_latency = max(self.metrics.max_write_latency, latency)
+        self.metrics.max_queued_bytes = max(self.metrics.max_queued_bytes, queued)
+        self._adapt(latency, queued)
+    
+    def _adapt(self, latency: float, queued: int):
+        """Update the output mode and frame interval from the latest write"""
+        self.backpressure = latency > self.slow_write_threshold or queued > self.queue_threshold
+        if self.backpressure:
+            self.metrics.mode = "diff"
+            self.metrics.interval = self.base_interval + latency
+        else:
+            self.metrics.mode = "full"
+            self.metrics.interval = self.base_interval
+    
+    def wait(self):
+        """Sleep until the next frame is due, without trying to catch up if late"""
+        now = time.perf_counter()
+        if self._deadline is None:
+            self._deadline = now
+        self._deadline += self.metrics.interval
+        delay = self._deadline - now
+        if delay > 0:
+            time.sleep(delay)
+        elif delay < 0:
+            self.metrics.late_frames += 1
+            self._deadline = now
+
+
+class NdjsonWriter:
+    """Streams frames to a pipeline as newline-delimited JSON
+    
+    Each line is one frame with its sequence number, stage, timestamp and
+    canvas size, plus either every row or, when fewer than half the rows
+    changed, a ``diff`` of [row, text] pairs against the previous frame.
+    Every ``keyframe_interval``-th frame is sent in full so consumers can
+    join mid-stream. Constant fragments are encoded once, and lines are
+    written ``batch_size`` frames at a time.
+    """
+    
+    def __init__(self, stream, width: int, height: int, batch_size: int = 256,
+                 keyframe_interval: int = 100):
+        self.stream = stream
+        self.batch_size = batch_size
+        self.keyframe_interval = keyframe_interval
+        self.frames = 0
+        self._dims = f',"w":{width},"h":{height}'
+        self._stages = {stage: f',"stage":{encode_basestring(stage.value)},"t":'
+                        for stage in GrowthStage}
+        self._names = {stage: encode_basestring(stage.value) for stage in GrowthStage}
+        self._names[None] = "null"
+        self._previous: Optional[List[str]] = None
+        self._buffer: List[str] = []
+    
+    def write_frame(self, stage: GrowthStage, timestamp: float, rows: List[str],
+                    stages: Optional[List[Optional[GrowthStage]]] = None):
+        """Queue one frame, flushing when a full batch has built up
+        
+        ``stages`` adds the stage of each panel when they differ; None is
+        written as null.
+        """
+        head = f'{{"seq":{self.frames}{self._stages[stage]}{float(timestamp)!r}{self._dims}'
+        if stages is not None:
+            head += ',"stages":[' + ",".join(self._names[s] for s in stages) + "]"
+        previous = self._previous
+        body = None
+        if (previous is not None and len(previous) == len(rows)
+                and self.frames % self.keyframe_interval):
+            # Unchanged rows are usually the very same cached string objects
+            changed = [i for i, (row, old) in enumerate(zip(rows, previous))
+                       if row is not old and row != old]
+            if len(changed) * 2 < len(rows):
+                body = ',"diff":[' + ",".join(f"[{i},{encode_basestring(rows[i])}]"
+                                               for i in changed) + "]}\n"
+        if body is None:
+            body = ',"rows":[' + ",".join(map(encode_basestring, rows)) + "]}\n"
+        
+        self._buffer.append(head + body)
+        self._previous = rows
+        self.frames += 1
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        """Write out every queued frame"""
+        if self._buffer:
+            self.stream.write("".join(self._buffer))
+            self._buffer.clear()
+        self.stream.flush()
 
 
 class PotatoArt:
     """ASCII art patterns for different growth stages"""
     
-    def __init__(self, variety: str = "russet"):
+    def __init__(self, variety: str = "russet", params: Optional[Dict[str, Any]] = None):
         self.variety = variety
         try:
             from potato_varieties import get_variety
-            self.variety_obj = get_variety(variety)
+            self.variety_obj = get_variety(variety, params)
             self.patterns = None  # Use variety_obj patterns
         except ImportError:
             self.variety_obj = None
@@ -164,22 +537,60 @@ class PotatoArt:
         """Get ASCII pattern for a specific growth stage"""
         if self.variety_obj:
             return self.variety_obj.get_pattern(stage)
-        elif self.patterns:
-            return self.patterns.get(stage, ["?"])
-        else:
-            # Load default patterns if not loaded
-            self.patterns = self._load_default_patterns()
-            return self.patterns.get(stage, ["?"])
+        return self.patterns.get(stage, ["?"])
+    
+    def get_duration(self, stage: GrowthStage) -> float:
+        """Get the time spent in a stage as a multiple of the growth speed"""
+        if self.variety_obj:
+            return self.variety_obj.get_duration(stage)
+        return 1.0
+
+
+class FrameView:
+    """Lightweight handle on one frame that renders only when accessed"""
+    
+    __slots__ = ("engine", "stage", "index")
+    
+    def __init__(self, engine: "AnimationEngine", stage: GrowthStage, index: int):
+        self.engine = engine
+        self.stage = stage
+        self.index = index
+    
+    @property
+    def rows(self) -> List[str]:
+        """Rendered canvas rows of this frame"""
+        return self.engine.render_rows(self.stage)
+    
+    def render_into(self, buffer, offset: int = 0) -> int:
+        """Write this frame as UTF-8 into a caller-owned buffer"""
+        return self.engine.render_into(buffer, self.stage, offset)
+    
+    def __str__(self) -> str:
+        return self.engine.render_frame(self.stage)
+    
+    def __repr__(self) -> str:
+        return f"FrameView(stage={self.stage.value!r}, index={self.index})"
 
 
 class AnimationEngine:
-    """Handles the animation logic and rendering"""
+    """Handles the animation logic and rendering
+    
+    Rendering is reentrant: the engine keeps a frozen snapshot of its
+    configuration and the only state touched while rendering is the sprite
+    cache, which is filled idempotently, so one engine can serve many
+    threads at once.
+    """
     
     def __init__(self, config: PotatoConfig):
-        self.config = config
-        self.potato_art = PotatoArt(config.variety)
-        self.current_stage = 0
+        self.config = freeze_config(config)
+        self.potato_art = PotatoArt(self.config.variety, self.config.variety_params)
         self.stages = list(GrowthStage)
+        self._sprite_cache: Dict[GrowthStage, Dict[int, List[Tuple[int, str]]]] = {}
+        self.pacing_metrics: Optional[PacingMetrics] = None
+        self.frame_cache = None
+        if config.shared_cache:
+            from potato_shm import shared_frame_cache
+            self.frame_cache = shared_frame_cache(config.shared_cache)
     
     def clear_screen(self):
         """Clear the terminal screen"""
@@ -187,84 +598,137 @@ class AnimationEngine:
     
     def render_frame(self, stage: GrowthStage) -> str:
         """Render a single frame of the animation"""
-        pattern = self.potato_art.get_pattern(stage)
-        canvas = []
-        
-        # Create soil line
-        soil_line = self.config.canvas_height - 8
-        
-        # Build canvas with improved soil layers
-        for row in range(self.config.canvas_height):
-            line = ""
-            for col in range(self.config.canvas_width):
-                if row == soil_line:
-                    # Surface soil line
-                    line += "~" if col % 2 == 0 else "-"
-                elif row > soil_line and row <= soil_line + 2:
-                    # Upper soil layer (loose topsoil)
-                    char_types = ["▒", "░", "▓"]
-                    line += char_types[(col + row) % 3]
-                elif row > soil_line + 2:
-                    # Lower soil layer (dense subsoil)
-                    char_types = ["█", "▓", "▒"]
-                    line += char_types[(col + row * 2) % 3]
-                else:
-                    line += " "
-            canvas.append(line)
+        return '\n'.join(self.render_rows(stage))
+    
+    def terminal_rows(self, stage: GrowthStage) -> List[str]:
+        """Render a frame with its stage header and rules, as shown in the terminal"""
+        header, footer = self.terminal_chrome(stage)
+        return [*header, *self.render_rows(stage), *footer]
+    
+    def terminal_chrome(self, stage: GrowthStage) -> Tuple[List[str], List[str]]:
+        """The rows drawn above and below the canvas in the terminal"""
+        rule = "=" * self.config.canvas_width
+        return [f"Growth Stage: {stage.value.title()}", rule], [rule]
+    
+    def write_terminal_frame(self, pacer: FramePacer, stage: GrowthStage) -> bool:
+        """Write a stage through a pacer, straight from the shared frame cache if there is one"""
+        if self.frame_cache is None:
+            return pacer.write_frame(self.terminal_rows(stage))
+        header, footer = self.terminal_chrome(stage)
+        with self.frame_cache.get_frame(self, stage) as view:
+            return pacer.write_encoded_frame(header, view, footer)
+    
+    def render_rows(self, stage: GrowthStage) -> List[str]:
+        """Render a single frame as a list of canvas rows
         
-        # Place potato pattern (allow underground growth)
-        if pattern and len(pattern) > 0:
-            # Find the longest line for centering
-            max_pattern_width = max(len(line) for line in pattern) if pattern else 0
-            start_col = self.config.canvas_width // 2 - max_pattern_width // 2
-            
-            # Position pattern so foliage is above ground and tubers create underground mound
-            # Only flowers, leaves, and stems should be above ground
-            above_ground_chars = "❀✿❋✾\\|/─━┬┼╷│║┃┏┓╔╗╭╮"
-            above_ground_lines = 0
-            for line in pattern:
-                if any(c in above_ground_chars for c in line):
-                    above_ground_lines += 1
-                else:
-                    break  # Stop counting when we hit underground parts
-            
-            # Position so foliage appears above soil and tubers below
-            start_row = soil_line - above_ground_lines + 1
-            
-            for i, pattern_line in enumerate(pattern):
-                row = start_row + i
-                if 0 <= row < len(canvas):
-                    canvas_line = list(canvas[row])
-                    line_start_col = start_col + (max_pattern_width - len(pattern_line)) // 2
-                    
-                    for j, char in enumerate(pattern_line):
-                        col = line_start_col + j
-                        if 0 <= col < len(canvas_line) and char != " ":
-                            canvas_line[col] = char
-                    canvas[row] = ''.join(canvas_line)
+        Frames from the shared cache are decoded here; the terminal path
+        uses write_terminal_frame to avoid that.
+        """
+        if self.frame_cache is not None:
+            with self.frame_cache.get_frame(self, stage) as view:
+                return str(view, 'utf-8').split('\n')
+        canvas = list(build_soil_rows(self.config.canvas_width, self.config.canvas_height))
+        for row, runs in self.sprite_rows(stage).items():
+            canvas[row] = compose_row(canvas[row], runs)
+        return canvas
+    
+    def frame_buffer_size(self) -> int:
+        """Upper bound in bytes of any UTF-8 encoded frame for this canvas"""
+        return self.config.canvas_height * (self.config.canvas_width * 4 + 1)
+    
+    def render_into(self, buffer, stage: GrowthStage, offset: int = 0) -> int:
+        """Render a frame as UTF-8 directly into a caller-owned writable buffer
         
-        return '\n'.join(canvas)
+        Rows without sprites are copied from a cached encoding of the soil
+        background. Returns the number of bytes written at ``offset`` and
+        raises ValueError if the buffer is too small.
+        """
+        background = encode_soil_rows(self.config.canvas_width, self.config.canvas_height)
+        sprite_rows = self.sprite_rows(stage)
+        soil = build_soil_rows(self.config.canvas_width, self.config.canvas_height)
+        with memoryview(buffer) as view:
+            if view.format != 'B' or view.ndim != 1:
+                view = view.cast('B')
+            pos = offset
+            for row, encoded in enumerate(background):
+                runs = sprite_rows.get(row)
+                if runs:
+                    encoded = compose_row(soil[row], runs).encode('utf-8')
+                end = pos + len(encoded) + (1 if row else 0)
+                if end > len(view):
+                    raise ValueError(f"Buffer too small for frame ({len(view)} bytes)")
+                if row:
+                    view[pos] = 0x0A
+                    pos += 1
+                view[pos:end] = encoded
+                pos = end
+        return pos - offset
+    
+    def iter_frames(self, stages: Optional[List[GrowthStage]] = None) -> Iterator["FrameView"]:
+        """Lazily yield a view of each frame; nothing is rendered until asked"""
+        for index, stage in enumerate(self.stages if stages is None else stages):
+            yield FrameView(self, stage, index)
+    
+    def sprite_rows(self, stage: GrowthStage) -> Dict[int, List[Tuple[int, str]]]:
+        """Get the clipped sprite runs for a stage, keyed by canvas row"""
+        runs = self._sprite_cache.get(stage)
+        if runs is None:
+            # Racing threads compute the same layout, so whichever store
+            # lands last is as good as any other; no lock needed.
+            runs = layout_sprite(self.potato_art.get_pattern(stage),
+                                 self.config.canvas_width, self.config.canvas_height)
+            self._sprite_cache[stage] = runs
+        return runs
     
     def animate(self):
         """Run the complete growth animation"""
         if self.config.output_format in ["terminal", "both"]:
+            pacer = FramePacer(sys.stdout, self.config.growth_speed,
+                               self.config.slow_write_threshold)
+            self.pacing_metrics = pacer.metrics
             for stage in self.stages:
-                self.clear_screen()
-                frame = self.render_frame(stage)
-                print(f"Growth Stage: {stage.value.title()}")
-                print("=" * self.config.canvas_width)
-                print(frame)
-                print("=" * self.config.canvas_width)
+                self.write_terminal_frame(pacer, stage)
                 
                 if stage != self.stages[-1]:  # Don't wait after final stage
-                    time.sleep(self.config.growth_speed)
+                    pacer.wait()
         
         if self.config.output_format in ["file", "both"]:
             self.save_to_file()
+        
+        if self.config.output_format in ["svg", "html"]:
+            from potato_export import export_animation
+            export_animation(self, self.config.output_format, self.config.output_file)
+        
+        if self.config.output_format == "ndjson":
+            self.stream_ndjson()
+    
+    def stream_ndjson(self, stream=None):
+        """Write every stage as NDJSON, timestamped in animation time without sleeping"""
+        writer = NdjsonWriter(stream or sys.stdout, self.config.canvas_width,
+                              self.config.canvas_height)
+        for i, stage in enumerate(self.stages):
+            writer.write_frame(stage, i * self.config.growth_speed, self.render_rows(stage))
+        writer.flush()
+    
+    def cache_fingerprint(self, kind: str = "txt") -> Dict[str, Any]:
+        """Everything that determines this engine's exported output of a kind"""
+        timed = kind in TIMED_EXPORT_KINDS
+        ignored = EXPORT_IGNORED_FIELDS if timed else EXPORT_IGNORED_FIELDS + EXPORT_TIMING_FIELDS
+        fingerprint = {
+            "renderer": RENDERER_VERSION,
+            "config": {k: v for k, v in config_dict(self.config).items() if k not in ignored},
+            "patterns": {s.value: self.potato_art.get_pattern(s) for s in self.stages},
+        }
+        if timed:
+            fingerprint["durations"] = {s.value: self.potato_art.get_duration(s) for s in self.stages}
+        return fingerprint
     
     def save_to_file(self):
         """Save animation frames to a file"""
         filename = self.config.output_file or "potato_growth.txt"
+        cached_export(self, "txt", filename, self._write_text)
+    
+    def _write_text(self, filename: str):
         with open(filename, 'w') as f:
             f.write("Potato Growth Animation\n")
             f.write("=" * 50 + "\n\n")
@@ -277,12 +741,490 @@ class AnimationEngine:
                 f.write("\n\n")
 
 
+@lru_cache(maxsize=128)
+def shared_engine(variety: str, width: int, height: int) -> AnimationEngine:
+    """Get a cached engine for a variety and canvas size, shared across threads"""
+    return AnimationEngine(PotatoConfig(variety=variety, canvas_width=width, canvas_height=height))
+
+
+def render_batch(requests: List[Tuple[str, GrowthStage, Tuple[int, int]]],
+                 max_workers: Optional[int] = None) -> List[str]:
+    """Render (variety, stage, (width, height)) requests on a thread pool
+    
+    Results come back in request order. Engines are shared between requests
+    with the same variety and canvas size.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    def render(request):
+        variety, stage, (width, height) = request
+        return shared_engine(variety, width, height).render_frame(stage)
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(render, requests))
+
+
+def benchmark_batch(thread_counts=(1, 2, 4, 8), repeat: int = 4) -> Dict[str, Any]:
+    """Time render_batch over every variety, stage and a few canvas sizes per thread count"""
+    from potato_varieties import list_varieties
+    
+    sizes = [(40, 20), (60, 30), (24, 14)]
+    requests = [(variety, stage, size) for variety in list_varieties()
+                for stage in GrowthStage for size in sizes] * repeat
+    results = {"requests": len(requests), "frames_per_s": {}}
+    for workers in thread_counts:
+        shared_engine.cache_clear()
+        start = time.perf_counter()
+        render_batch(requests, max_workers=workers)
+        elapsed = time.perf_counter() - start
+        results["frames_per_s"][workers] = round(len(requests) / elapsed, 1)
+    return results
+
+
+class ComparisonEngine:
+    """Renders several configurations side by side on one shared canvas
+    
+    Every panel moves through the growth stages together. The soil
+    background for the whole canvas is built once, and each frame is
+    composited row by row from the per-panel sprite runs, so no panel ever
+    allocates a full canvas of its own. Panels never use the shared frame
+    cache, since they are composited from sprites rather than whole frames.
+    """
+    
+    def __init__(self, configs: List[PotatoConfig], separator: str = " "):
+        if not configs:
+            raise ValueError("ComparisonEngine needs at least one configuration")
+        self.height = configs[0].canvas_height
+        if any(c.canvas_height != self.height for c in configs):
+            raise ValueError("All compared configurations must share a canvas height")
+        
+        self.separator = separator
+        self.panels = [AnimationEngine(replace(c, shared_cache=None)) for c in configs]
+        self.config = self.panels[0].config
+        self.stages = list(GrowthStage)
+        
+        self.offsets = []
+        col = 0
+        for panel in self.panels:
+            self.offsets.append(col)
+            col += panel.config.canvas_width + len(separator)
+        self.width = col - len(separator)
+        
+        soils = [build_soil_rows(p.config.canvas_width, self.height) for p in self.panels]
+        self.background = [separator.join(soil[row] for soil in soils)
+                           for row in range(self.height)]
+        self.pacing_metrics: Optional[PacingMetrics] = None
+    
+    @classmethod
+    def for_varieties(cls, config: PotatoConfig, varieties: List[str],
+                      separator: str = " ") -> "ComparisonEngine":
+        """Build a comparison of several varieties sharing one base config"""
+        return cls([replace(config, variety=v, compare_varieties=None) for v in varieties],
+                   separator)
+    
+    def render_labels(self) -> str:
+        """Render a header line with each panel's variety name centred over it"""
+        return self.separator.join(
+            p.config.variety[:p.config.canvas_width].center(p.config.canvas_width)
+            for p in self.panels)
+    
+    def render_frame(self, stage: GrowthStage) -> str:
+        """Render one stage for every panel in a single compositing pass"""
+        return self.render_stages([stage] * len(self.panels))
+    
+    def terminal_rows(self, stage: GrowthStage) -> List[str]:
+        """Render a frame with its stage header, labels and rules, as shown in the terminal"""
+        rule = "=" * self.width
+        return [f"Growth Stage: {stage.value.title()}", self.render_labels(), rule,
+                *self.render_rows(stage), rule]
+    
+    def write_terminal_frame(self, pacer: FramePacer, stage: GrowthStage) -> bool:
+        """Write a stage through a pacer"""
+        return pacer.write_frame(self.terminal_rows(stage))
+    
+    def render_rows(self, stage: GrowthStage) -> List[str]:
+        """Render one stage for every panel as a list of canvas rows"""
+        return self.render_stage_rows([stage] * len(self.panels))
+    
+    def render_stages(self, stages: List[GrowthStage]) -> str:
+        """Render each panel at its own stage in a single compositing pass"""
+        return '\n'.join(self.render_stage_rows(stages))
+    
+    def render_stage_rows(self, stages: List[Optional[GrowthStage]]) -> List[str]:
+        """Render each panel at its own stage as a list of canvas rows
+        
+        A stage of None leaves that panel as bare soil.
+        """
+        panel_rows = [(offset, panel.sprite_rows(stage) if stage is not None else {})
+                      for offset, panel, stage in zip(self.offsets, self.panels, stages)]
+        canvas = []
+        for row, background in enumerate(self.background):
+            runs = []
+            for offset, sprite_rows in panel_rows:
+                row_runs = sprite_rows.get(row)
+                if row_runs:
+                    runs.extend((offset + col, text) for col, text in row_runs)
+            canvas.append(compose_row(background, runs) if runs else background)
+        return canvas
+    
+    def animate(self):
+        """Run the growth animation for all panels at once"""
+        if self.config.output_format in ["terminal", "both"]:
+            pacer = FramePacer(sys.stdout, self.config.growth_speed,
+                               self.config.slow_write_threshold)
+            self.pacing_metrics = pacer.metrics
+            for stage in self.stages:
+                self.write_terminal_frame(pacer, stage)
+                
+                if stage != self.stages[-1]:  # Don't wait after final stage
+                    pacer.wait()
+        
+        if self.config.output_format in ["file", "both"]:
+            self.save_to_file()
+        
+        if self.config.output_format in ["svg", "html"]:
+            from potato_export import export_animation
+            export_animation(self, self.config.output_format, self.config.output_file)
+        
+        if self.config.output_format == "ndjson":
+            self.stream_ndjson()
+    
+    def stream_ndjson(self, stream=None):
+        """Write every stage as NDJSON, timestamped in animation time without sleeping"""
+        writer = NdjsonWriter(stream or sys.stdout, self.width, self.height)
+        for i, stage in enumerate(self.stages):
+            writer.write_frame(stage, i * self.config.growth_speed, self.render_rows(stage))
+        writer.flush()
+    
+    def cache_fingerprint(self, kind: str = "txt") -> Dict[str, Any]:
+        """Everything that determines this comparison's exported output of a kind"""
+        return {
+            "renderer": RENDERER_VERSION,
+            "separator": self.separator,
+            "panels": [panel.cache_fingerprint(kind) for panel in self.panels],
+        }
+    
+    def save_to_file(self):
+        """Save the side-by-side frames to a file"""
+        filename = self.config.output_file or "potato_comparison.txt"
+        cached_export(self, "txt", filename, self._write_text)
+    
+    def _write_text(self, filename: str):
+        with open(filename, 'w') as f:
+            f.write("Potato Growth Comparison\n")
+            f.write("=" * 50 + "\n\n")
+            f.write(self.render_labels() + "\n")
+            
+            for stage in self.stages:
+                f.write(f"Stage: {stage.value.title()}\n")
+                f.write("-" * 30 + "\n")
+                f.write(self.render_frame(stage))
+                f.write("\n\n")
+
+
+@dataclass
+class Plant:
+    """One plant in a scheduled field, with its own growth timeline"""
+    variety: str = "russet"
+    params: Optional[Dict[str, Any]] = None  # variety parameters, overriding the config's
+    planted_at: float = 0.0
+    # Seconds per stage, overriding the variety's own timing
+    durations: Dict[GrowthStage, float] = field(default_factory=dict)
+    stage_index: int = 0  # -1 until the plant goes in the ground
+    next_transition: Optional[float] = None
+
+
+class GrowthScheduler:
+    """Event-driven growth of a field of plants with individual timelines
+    
+    Pending stage transitions sit in a heap of (time, plant) events. Each
+    wakeup pops only the plants that are due, advances them and redraws just
+    their panels, so the cost of a tick follows the number of transitions
+    rather than the number of plants. Planting is an event too: until then
+    a plant's panel is bare soil and its stage is None.
+    """
+    
+    def __init__(self, config: PotatoConfig, plants: List[Plant], separator: str = " "):
+        self.config = config
+        self.plants = plants
+        self.field = ComparisonEngine([replace(config, variety=p.variety, compare_varieties=None,
+                                               variety_params=p.params or config.variety_params)
+                                       for p in plants], separator)
+        self.stages = self.field.stages
+        self.now = 0.0
+        self.store = None
+        self.run_id: Optional[str] = None
+        self._events: List[Tuple[float, int]] = []
+        for plant_id, plant in enumerate(plants):
+            if plant.next_transition is not None:
+                continue
+            if plant.stage_index == 0 and plant.planted_at > self.now:
+                plant.stage_index = -1
+                plant.next_transition = plant.planted_at
+            elif 0 <= plant.stage_index < len(self.stages) - 1:
+                plant.next_transition = plant.planted_at + self.stage_duration(plant_id)
+        self._build_events()
+    
+    def _build_events(self):
+        self._events = [(plant.next_transition, plant_id)
+                        for plant_id, plant in enumerate(self.plants)
+                        if plant.next_transition is not None]
+        heapq.heapify(self._events)
+    
+    @classmethod
+    def staggered(cls, config: PotatoConfig, varieties: List[str],
+                  interval: float) -> "GrowthScheduler":
+        """Plant each variety ``interval`` seconds after the previous one"""
+        return cls(config, [Plant(variety=v, planted_at=i * interval)
+                            for i, v in enumerate(varieties)])
+    
+    def stage_duration(self, plant_id: int) -> float:
+        """Seconds the plant spends in its current stage"""
+        plant = self.plants[plant_id]
+        stage = self.stages[plant.stage_index]
+        if stage in plant.durations:
+            return plant.durations[stage]
+        art = self.field.panels[plant_id].potato_art
+        return art.get_duration(stage) * self.config.growth_speed
+    
+    def stage_of(self, plant_id: int) -> Optional[GrowthStage]:
+        """Current stage of a plant, or None if it has not been planted yet"""
+        stage_index = self.plants[plant_id].stage_index
+        return self.stages[stage_index] if stage_index >= 0 else None
+    
+    def next_event_time(self) -> Optional[float]:
+        """Time of the next pending transition, or None once every plant is done"""
+        return self._events[0][0] if self._events else None
+    
+    def advance(self, now: float) -> Dict[int, Optional[GrowthStage]]:
+        """Apply every transition due by ``now``
+        
+        Returns the plants that changed, mapped to the stage each was in
+        before this call (None for plants that were just planted).
+        """
+        changed: Dict[int, Optional[GrowthStage]] = {}
+        while self._events and self._events[0][0] <= now:
+            due, plant_id = heapq.heappop(self._events)
+            plant = self.plants[plant_id]
+            changed.setdefault(plant_id, self.stage_of(plant_id))
+            plant.stage_index += 1
+            if self.store is not None:
+                self.store.record_transition(self.run_id, plant_id, self.stages[plant.stage_index], due)
+            if plant.stage_index < len(self.stages) - 1:
+                plant.next_transition = due + self.stage_duration(plant_id)
+                heapq.heappush(self._events, (plant.next_transition, plant_id))
+            else:
+                plant.next_transition = None
+        self.now = max(self.now, now)
+        return changed
+    
+    def field_signature(self) -> Dict[str, Any]:
+        """Everything that fixes the plants' timelines, to check a resumed run matches"""
+        return {
+            "growth_speed": self.config.growth_speed,
+            "plants": [{"variety": p.variety, "params": config_dict(panel.config)["variety_params"],
+                        "planted_at": p.planted_at,
+                        "durations": {s.value: d for s, d in p.durations.items()},
+                        "stage_durations": [panel.potato_art.get_duration(s)
+                                            for s in self.stages]}
+                       for p, panel in zip(self.plants, self.field.panels)],
+        }
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serialisable state of every plant's timeline"""
+        return {"t": self.now,
+                "plants": [[p.stage_index, p.next_transition] for p in self.plants]}
+    
+    def restore(self, state: Dict[str, Any]):
+        """Resume from a snapshot taken of a scheduler with the same plants"""
+        if len(state["plants"]) != len(self.plants):
+            raise ValueError("Snapshot was taken of a different field")
+        for plant, (stage_index, next_transition) in zip(self.plants, state["plants"]):
+            plant.stage_index = stage_index
+            plant.next_transition = next_transition
+        self.now = state["t"]
+        self._build_events()
+    
+    def attach_store(self, store, run_id: str) -> bool:
+        """Record transitions to a SimulationStore, resuming the run if it has a checkpoint
+        
+        Returns True if the scheduler was restored from a checkpoint.
+        """
+        from potato_store import RunMismatchError
+        
+        field = json.loads(json.dumps(self.field_signature()))
+        stored = store.run_config(run_id)
+        if stored is not None and stored.get("field") != field:
+            raise RunMismatchError(f"Run {run_id!r} in the store was started with a different field "
+                                   "(varieties, planting times or timings); choose another run id")
+        self.store = store
+        self.run_id = run_id
+        store.start_run(run_id, {"config": config_dict(self.config), "field": field})
+        state = store.resume(run_id)
+        if state is not None:
+            self.restore(state)
+            return True
+        for plant_id, plant in enumerate(self.plants):
+            if plant.stage_index >= 0:  # the rest are recorded when they are planted
+                store.record_transition(run_id, plant_id, self.stage_of(plant_id), plant.planted_at)
+        self.checkpoint()
+        return False
+    
+    def checkpoint(self):
+        """Save the current state to the attached store"""
+        if self.store is not None:
+            self.store.checkpoint(self.run_id, self.now, self.snapshot())
+    
+    def render(self) -> str:
+        """Render the whole field with every plant at its current stage"""
+        return self.field.render_stages([self.stage_of(i) for i in range(len(self.plants))])
+    
+    def dirty_segments(self, plant_id: int,
+                       previous: Optional[GrowthStage]) -> List[Tuple[int, int, str]]:
+        """Redraw a plant's panel as (row, column, text) for rows its change touched"""
+        panel = self.field.panels[plant_id]
+        offset = self.field.offsets[plant_id]
+        width = panel.config.canvas_width
+        stage = self.stage_of(plant_id)
+        old_rows = panel.sprite_rows(previous) if previous is not None else {}
+        new_rows = panel.sprite_rows(stage) if stage is not None else {}
+        segments = []
+        for row in sorted(set(old_rows) | set(new_rows)):
+            if old_rows.get(row) == new_rows.get(row):
+                continue
+            background = self.field.background[row][offset:offset + width]
+            runs = new_rows.get(row)
+            segments.append((row, offset, compose_row(background, runs) if runs else background))
+        return segments
+    
+    def ticks(self, clock=time.monotonic, sleep=time.sleep,
+              checkpoint_interval: float = 10.0) -> Iterator[Dict[int, Optional[GrowthStage]]]:
+        """Advance plants as their transitions fall due, yielding what changed
+        
+        With ``clock=None`` the field moves straight from one event to the
+        next in simulation time, without sleeping. With a store attached,
+        state is checkpointed every ``checkpoint_interval`` seconds of
+        simulation time and at the end.
+        """
+        start = None if clock is None else clock() - self.now
+        last_checkpoint = self.now
+        while True:
+            due = self.next_event_time()
+            if due is None:
+                break
+            if start is None:
+                now = due
+            else:
+                delay = due - (clock() - start)
+                if delay > 0:
+                    sleep(delay)
+                now = clock() - start
+            changed = self.advance(now)
+            if changed:
+                yield changed
+            if self.now - last_checkpoint >= checkpoint_interval:
+                self.checkpoint()
+                last_checkpoint = self.now
+        self.checkpoint()
+    
+    def run(self, stream=None, clock=time.monotonic, sleep=time.sleep,
+            checkpoint_interval: float = 10.0, log=None):
+        """Draw the field, then redraw only the plants that change until all are done
+        
+        ``log`` is called with the simulation time after every redraw.
+        """
+        stream = stream or sys.stdout
+        top = 3  # screen row of the first canvas row, below the labels and rule
+        stream.write(ANSI_CLEAR + self.field.render_labels() + "\n" + "=" * self.field.width
+                     + "\n" + self.render() + "\n")
+        stream.flush()
+        
+        for changed in self.ticks(clock, sleep, checkpoint_interval):
+            parts = []
+            for plant_id, previous in changed.items():
+                for row, col, text in self.dirty_segments(plant_id, previous):
+                    parts.append(f"\033[{top + row};{col + 1}H{text}")
+            parts.append(f"\033[{top + self.field.height};1H")
+            stream.write("".join(parts))
+            stream.flush()
+            if log:
+                log(self.now)
+    
+    def animate(self, stream=None, clock=time.monotonic, sleep=time.sleep,
+                checkpoint_interval: float = 10.0):
+        """Run the field in the configured output format"""
+        output_format = self.config.output_format
+        if output_format not in SCHEDULER_FORMATS:
+            raise ValueError(f"Staggered fields support {', '.join(SCHEDULER_FORMATS)} output, "
+                             f"not {output_format}")
+        filename = self.config.output_file or "potato_field.txt"
+        if output_format == "terminal":
+            self.run(stream, clock, sleep, checkpoint_interval)
+        elif output_format == "both":
+            with open(filename, 'w') as f:
+                self._write_text_header(f)
+                self.run(stream, clock, sleep, checkpoint_interval,
+                         log=lambda now: self._write_text_frame(f))
+        elif output_format == "file":
+            self.save_to_file(filename, checkpoint_interval)
+        else:
+            self.stream_ndjson(stream, checkpoint_interval)
+    
+    def save_to_file(self, filename: str = "potato_field.txt", checkpoint_interval: float = 10.0):
+        """Write the field after every transition, in simulation time without sleeping"""
+        with open(filename, 'w') as f:
+            self._write_text_header(f)
+            for _ in self.ticks(None, checkpoint_interval=checkpoint_interval):
+                self._write_text_frame(f)
+    
+    def _write_text_header(self, f):
+        f.write("Potato Growth Field\n")
+        f.write("=" * 50 + "\n\n")
+        f.write(self.field.render_labels() + "\n")
+        self._write_text_frame(f)
+    
+    def _write_text_frame(self, f):
+        stages = ", ".join(stage.value.title() if stage else "Unplanted"
+                           for stage in map(self.stage_of, range(len(self.plants))))
+        f.write(f"t={self.now:.2f}s: {stages}\n")
+        f.write("-" * 30 + "\n")
+        f.write(self.render())
+        f.write("\n\n")
+    
+    def stream_ndjson(self, stream=None, checkpoint_interval: float = 10.0):
+        """Write the field as NDJSON after every transition, in simulation time without sleeping
+        
+        ``stage`` is the least advanced planted plant's stage; ``stages``
+        lists every plant's, with null for plants not yet planted.
+        """
+        writer = NdjsonWriter(stream or sys.stdout, self.field.width, self.field.height)
+        
+        def write():
+            stages = [self.stage_of(i) for i in range(len(self.plants))]
+            planted = [stage for stage in stages if stage is not None] or [self.stages[0]]
+            writer.write_frame(min(planted, key=self.stages.index), self.now,
+                               self.field.render_stage_rows(stages), stages)
+        
+        write()
+        for _ in self.ticks(None, checkpoint_interval=checkpoint_interval):
+            write()
+        writer.flush()
+
+
 class PotatoGrowthSimulator:
     """Main class that orchestrates the potato growth simulation"""
     
     def __init__(self, config: PotatoConfig):
         self.config = config
         self.animation_engine = AnimationEngine(config)
+        self.comparison_engine = None
+        self.scheduler = None
+        if config.state_store or (config.compare_varieties and config.planting_interval is not None):
+            self.scheduler = GrowthScheduler.staggered(config,
+                                                       config.compare_varieties or [config.variety],
+                                                       config.planting_interval or 0.0)
+        elif config.compare_varieties:
+            self.comparison_engine = ComparisonEngine.for_varieties(config, config.compare_varieties)
         self._setup_logging()
     
     def _setup_logging(self):
@@ -295,9 +1237,33 @@ class PotatoGrowthSimulator:
     
     def run(self):
         """Start the potato growth simulation"""
-        self.logger.info(f"Starting potato growth simulation - variety: {self.config.variety}")
-        self.animation_engine.animate()
+        if self.scheduler:
+            varieties = ", ".join(self.config.compare_varieties or [self.config.variety])
+            self.logger.info(f"Starting staggered potato field - varieties: {varieties}")
+            self._run_scheduler()
+        elif self.comparison_engine:
+            varieties = ", ".join(self.config.compare_varieties)
+            self.logger.info(f"Starting potato growth comparison - varieties: {varieties}")
+            self.comparison_engine.animate()
+        else:
+            self.logger.info(f"Starting potato growth simulation - variety: {self.config.variety}")
+            self.animation_engine.animate()
+        engine = self.comparison_engine or self.animation_engine
+        if not self.scheduler and engine.pacing_metrics:
+            self.logger.info(f"Frame pacing: {asdict(engine.pacing_metrics)}")
         self.logger.info("Potato growth simulation completed")
+    
+    def _run_scheduler(self):
+        """Run the scheduled field, checkpointing to the state store if configured"""
+        if not self.config.state_store:
+            self.scheduler.animate()
+            return
+        
+        from potato_store import SimulationStore
+        with SimulationStore(self.config.state_store) as store:
+            if self.scheduler.attach_store(store, self.config.run_id):
+                self.logger.info(f"Resuming run {self.config.run_id} at t={self.scheduler.now:.2f}s")
+            self.scheduler.animate(checkpoint_interval=self.config.checkpoint_interval)
 
 
 def load_config(config_file: Optional[str] = None) -> PotatoConfig:
@@ -314,6 +1280,166 @@ def load_config(config_file: Optional[str] = None) -> PotatoConfig:
     return config
 
 
+# Fields that change what frames look like or where they are cached; anything
+# else can be swapped in without rebuilding the engine and its caches
+ENGINE_REBUILD_FIELDS = ("variety", "variety_params", "canvas_width", "canvas_height",
+                 "compare_varieties", "output_format", "shared_cache")
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process in bytes"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def cache_sizes() -> Dict[str, int]:
+    """Current entry counts of the module-level render caches"""
+    sizes = {
+        "soil_rows": build_soil_rows.cache_info().currsize,
+        "encoded_soil_rows": encode_soil_rows.cache_info().currsize,
+        "shared_engines": shared_engine.cache_info().currsize,
+    }
+    try:
+        from potato_varieties import generate_sprite
+        sizes["procedural_sprites"] = generate_sprite.cache_info().currsize
+    except ImportError:
+        pass
+    return sizes
+
+
+class PotatoDaemon:
+    """Loops the animation forever with bounded memory and config hot reload
+    
+    Between passes the config file's mtime is checked; when it changes the
+    file is reloaded and the engine is rebuilt only if a field that affects
+    rendering changed. All render caches are bounded, and the process RSS
+    and cache sizes are written to the status file as JSON. With the
+    ``ndjson`` output format frames are streamed as fast as the consumer
+    reads them, timestamped in animation time.
+    """
+    
+    def __init__(self, config: PotatoConfig, config_file: Optional[str] = None,
+                 overrides: Optional[Dict[str, Any]] = None, stream=None):
+        self.config = config
+        self.config_file = config_file
+        self.overrides = overrides or {}
+        self.stream = stream or sys.stdout
+        self.cycles = 0
+        self.sim_time = 0.0
+        self.ndjson: Optional[NdjsonWriter] = None
+        self.reloads = 0
+        self.engine_builds = 0
+        self.started = time.time()
+        self._config_stamp = self._stat_config()
+        self._build_engine()
+    
+    def _stat_config(self) -> Optional[Tuple[int, int]]:
+        if not self.config_file:
+            return None
+        try:
+            st = os.stat(self.config_file)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+    
+    def _build_engine(self):
+        if self.config.compare_varieties:
+            self.engine = ComparisonEngine.for_varieties(self.config, self.config.compare_varieties)
+        else:
+            self.engine = AnimationEngine(self.config)
+        self.engine_builds += 1
+        self.pacer = FramePacer(self.stream, self.config.growth_speed,
+                                self.config.slow_write_threshold)
+        
+        previous = self.ndjson
+        self.ndjson = None
+        if self.config.output_format == "ndjson":
+            width = getattr(self.engine, "width", self.config.canvas_width)
+            self.ndjson = NdjsonWriter(self.stream, width, self.config.canvas_height)
+        if previous:
+            previous.flush()
+            if self.ndjson:
+                self.ndjson.frames = previous.frames
+    
+    def check_reload(self) -> bool:
+        """Reload the config file if it changed; returns True if it was reloaded"""
+        stamp = self._stat_config()
+        if stamp is None or stamp == self._config_stamp:
+            return False
+        self._config_stamp = stamp
+        try:
+            config = load_config(self.config_file)
+        except (OSError, ValueError):
+            return False  # half-written file; the next change will retry
+        for key, value in self.overrides.items():
+            setattr(config, key, value)
+        if config.output_format not in LOOP_FORMATS:
+            logging.getLogger(__name__).warning(
+                f"Ignoring output_format {config.output_format!r} on reload; "
+                f"--loop supports {', '.join(LOOP_FORMATS)}")
+            config.output_format = self.config.output_format
+        
+        rebuild = any(getattr(config, f) != getattr(self.config, f) for f in ENGINE_REBUILD_FIELDS)
+        self.config = config
+        self.reloads += 1
+        if rebuild:
+            self._build_engine()
+        else:
+            self.pacer.base_interval = config.growth_speed
+            self.pacer.slow_write_threshold = config.slow_write_threshold
+        return True
+    
+    def run_cycle(self):
+        """Play one full pass through every growth stage"""
+        stages = self.engine.stages
+        if self.ndjson:
+            for stage in stages:
+                self.ndjson.write_frame(stage, self.sim_time, self.engine.render_rows(stage))
+                self.sim_time += self.config.growth_speed
+        else:
+            for stage in stages:
+                self.engine.write_terminal_frame(self.pacer, stage)
+                if stage != stages[-1]:
+                    self.pacer.wait()
+        self.cycles += 1
+    
+    def status(self) -> Dict[str, Any]:
+        """Snapshot of the daemon's health"""
+        return {
+            "cycles": self.cycles,
+            "reloads": self.reloads,
+            "engine_builds": self.engine_builds,
+            "uptime": round(time.time() - self.started, 3),
+            "rss_bytes": current_rss_bytes(),
+            "caches": cache_sizes(),
+            "variety": self.config.variety,
+        }
+    
+    def write_status(self):
+        """Atomically replace the status file with the current status"""
+        if not self.config.status_file:
+            return
+        tmp = self.config.status_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.status(), f)
+        os.replace(tmp, self.config.status_file)
+    
+    def run(self):
+        """Loop until max_cycles passes have been played, or forever"""
+        while self.config.max_cycles is None or self.cycles < self.config.max_cycles:
+            self.check_reload()
+            self.run_cycle()
+            self.write_status()
+            if self.config.growth_speed > 0 and not self.ndjson:
+                self.pacer.wait()
+        if self.ndjson:
+            self.ndjson.flush()
+
+
 def main():
     """Main entry point"""
     parser = argparse.ArgumentParser(description="Potato Growth Animation Simulator")
@@ -321,41 +1447,115 @@ def main():
     parser.add_argument("--speed", "-s", type=float, default=2.0, 
                        help="Growth speed (seconds between stages)")
     parser.add_argument("--variety", "-v", default="russet",
-                       help="Potato variety. Available varieties: russet (default), yukon_gold, red, fingerling")
+                       help="Potato variety. Available varieties: russet (default), yukon_gold, red, fingerling, procedural")
     parser.add_argument("--width", "-w", type=int, default=40,
                        help="Canvas width")
     parser.add_argument("--height", type=int, default=20,
                        help="Canvas height")
-    parser.add_argument("--output", "-o", choices=["terminal", "file", "both"],
+    parser.add_argument("--output", "-o", choices=["terminal", "file", "both", "svg", "html", "ndjson"],
                        default="terminal", help="Output format")
     parser.add_argument("--file", "-f", help="Output file name")
     parser.add_argument("--no-colors", action="store_true",
                        help="Disable color output")
+    parser.add_argument("--compare", metavar="VARIETIES",
+                       help="Comma-separated varieties to render side by side")
+    parser.add_argument("--stagger", type=float, metavar="SECONDS",
+                       help="With --compare, plant each variety this long after the previous one")
+    parser.add_argument("--loop", action="store_true",
+                       help="Repeat the animation until stopped, reloading the config file on change")
+    parser.add_argument("--cycles", type=int,
+                       help="With --loop, stop after this many passes")
+    parser.add_argument("--status-file", help="With --loop, write JSON status (RSS, caches) here")
+    parser.add_argument("--cache-dir", help="Reuse unchanged file exports from this cache directory")
+    parser.add_argument("--cache-size", type=int, metavar="MB",
+                       help="Maximum export cache size in megabytes")
+    parser.add_argument("--force", action="store_true",
+                       help="Re-render exports even when the cache has them")
+    parser.add_argument("--shared-cache", metavar="NAME",
+                       help="Share rendered frames with other players using the same name")
+    parser.add_argument("--store", metavar="PATH",
+                       help="Checkpoint the run and record stage history in this SQLite file")
+    parser.add_argument("--run-id", help="Name of the run inside the state store")
+    parser.add_argument("--checkpoint-interval", type=float, metavar="SECONDS",
+                       help="Simulated seconds between checkpoints")
+    parser.add_argument("--benchmark-threads", action="store_true",
+                       help="Print batch rendering throughput for 1, 2, 4 and 8 threads and exit")
     
     args = parser.parse_args()
     
+    if args.benchmark_threads:
+        print(json.dumps(benchmark_batch(), indent=2))
+        return
+    
     # Load configuration
     config = load_config(args.config)
     
     # Override with command line arguments
+    overrides: Dict[str, Any] = {}
     if args.speed != 2.0:
-        config.growth_speed = args.speed
+        overrides["growth_speed"] = args.speed
     if args.variety != "russet":
-        config.variety = args.variety
+        overrides["variety"] = args.variety
     if args.width != 40:
-        config.canvas_width = args.width
+        overrides["canvas_width"] = args.width
     if args.height != 20:
-        config.canvas_height = args.height
+        overrides["canvas_height"] = args.height
     if args.output != "terminal":
-        config.output_format = args.output
+        overrides["output_format"] = args.output
     if args.file:
-        config.output_file = args.file
+        overrides["output_file"] = args.file
     if args.no_colors:
-        config.show_colors = False
+        overrides["show_colors"] = False
+    if args.compare:
+        overrides["compare_varieties"] = [v.strip() for v in args.compare.split(",") if v.strip()]
+    if args.stagger is not None:
+        overrides["planting_interval"] = args.stagger
+    if args.loop:
+        overrides["loop"] = True
+    if args.cycles is not None:
+        overrides["max_cycles"] = args.cycles
+    if args.status_file:
+        overrides["status_file"] = args.status_file
+    if args.cache_dir:
+        overrides["export_cache_dir"] = args.cache_dir
+    if args.cache_size is not None:
+        overrides["export_cache_size"] = args.cache_size * 1024 * 1024
+    if args.force:
+        overrides["force_export"] = True
+    if args.shared_cache:
+        overrides["shared_cache"] = args.shared_cache
+    if args.store:
+        overrides["state_store"] = args.store
+    if args.run_id:
+        overrides["run_id"] = args.run_id
+    if args.checkpoint_interval is not None:
+        overrides["checkpoint_interval"] = args.checkpoint_interval
+    for key, value in overrides.items():
+        setattr(config, key, value)
+    
+    if config.state_store or (config.compare_varieties and config.planting_interval is not None):
+        option = "--store" if config.state_store else "--stagger"
+        if config.loop:
+            parser.error(f"{option} cannot be combined with --loop")
+        if config.output_format not in SCHEDULER_FORMATS:
+            parser.error(f"{option} supports --output {', '.join(SCHEDULER_FORMATS)}")
+    
+    if config.shared_cache and config.compare_varieties:
+        parser.error("--shared-cache cannot be combined with --compare")
+    
+    if config.loop:
+        if config.output_format not in LOOP_FORMATS:
+            parser.error(f"--loop supports --output {', '.join(LOOP_FORMATS)}")
+        PotatoDaemon(config, args.config, overrides).run()
+        return
     
     # Create and run simulator
+    from potato_store import RunMismatchError
     simulator = PotatoGrowthSimulator(config)
-    simulator.run()
+    try:
+        simulator.run()
+    except RunMismatchError as e:
+        parser.error(str(e))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,110 @@
+"""
+Content-addressed cache for exported animation files.
+Outputs are keyed by a hash of everything that determines their contents, so
+unchanged exports are copied from the cache (or skipped) instead of re-rendered.
+"""
+
+import filecmp
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Callable, Dict
+
+
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+
+
+class ExportCache:
+    """Directory of cached export artifacts, evicted least-recently-used first"""
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_CACHE_SIZE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(fingerprint: Dict[str, Any], kind: str) -> str:
+        """Hash an engine fingerprint and export kind into a cache key"""
+        payload = json.dumps({"kind": kind, "fingerprint": fingerprint},
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def fetch(self, key: str, dest: str) -> bool:
+        """Materialise a cached artifact at ``dest``; returns False on a miss
+
+        If ``dest`` already holds the same bytes it is left untouched.
+        """
+        cached = self.path(key)
+        if not os.path.exists(cached):
+            return False
+        os.utime(cached)  # access time drives eviction; don't rely on atime mounts
+        if os.path.exists(dest) and filecmp.cmp(cached, dest, shallow=False):
+            return True
+        self._copy(cached, dest)
+        return True
+
+    def store(self, key: str, src: str):
+        """Add a freshly written artifact to the cache, then enforce the size cap"""
+        self._copy(src, self.path(key))
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits its size cap"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.is_file() or entry.name.startswith("."):
+                continue
+            st = entry.stat()
+            entries.append((st.st_atime, st.st_size, entry.path))
+            total += st.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    @staticmethod
+    def _copy(src: str, dest: str):
+        """Copy via a temporary file so readers never see a partial artifact"""
+        directory = os.path.dirname(os.path.abspath(dest))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".potato-")
+        os.close(fd)
+        try:
+            shutil.copyfile(src, tmp)
+            os.replace(tmp, dest)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+
+def cached_export(engine, kind: str, filename: str,
+                  write: Callable[[str], None]) -> bool:
+    """Write an export through the engine's cache, if one is configured
+
+    Returns True if the artifact came from the cache and nothing was
+    rendered. With ``force_export`` set the artifact is always re-rendered
+    and the cache entry refreshed.
+    """
+    config = engine.config
+    if not config.export_cache_dir:
+        write(filename)
+        return False
+
+    cache = ExportCache(config.export_cache_dir, config.export_cache_size)
+    key = cache.key(engine.cache_fingerprint(kind), kind)
+    if not config.force_export and cache.fetch(key, filename):
+        return True
+    write(filename)
+    cache.store(key, filename)
+    return False
@@ -0,0 +1,230 @@
+"""
+SVG and HTML export for potato growth frames.
+Frames are split into maximal runs of same-styled glyphs and streamed to the
+output file, so even large canvases produce compact documents.
+"""
+
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+from xml.sax.saxutils import escape
+
+from potato import ABOVE_GROUND_CHARS, GrowthStage
+from potato_cache import cached_export
+
+
+CELL_WIDTH = 0.6  # advance of one monospace glyph, in font-size units
+LINE_HEIGHT = 1.2
+
+FLOWER_CHARS = "❀✿❋✾"
+SURFACE_CHARS = "~-"
+SOIL_CHARS = "▒░▓█▪⋅•"
+
+# Glyph categories and the class suffix each one gets
+STYLE_CATEGORIES = ("fl", "st", "tu", "su", "so")
+
+VARIETY_COLORS = {
+    "russet": {"fl": "#f4f4f4", "st": "#3f8f3a", "tu": "#8b5a2b", "su": "#6b4f2a", "so": "#5a3d1e"},
+    "yukon_gold": {"fl": "#fff6c8", "st": "#4c9a2a", "tu": "#d9a521", "su": "#6b4f2a", "so": "#5a3d1e"},
+    "red": {"fl": "#f7c6d0", "st": "#2f7d32", "tu": "#b3262e", "su": "#6b4f2a", "so": "#5a3d1e"},
+    "fingerling": {"fl": "#e6d8f0", "st": "#3d8b4d", "tu": "#c89b63", "su": "#6b4f2a", "so": "#5a3d1e"},
+}
+
+
+def glyph_category(char: str) -> Optional[str]:
+    """Classify a glyph into a style category; spaces have none"""
+    if char == " ":
+        return None
+    if char in FLOWER_CHARS:
+        return "fl"
+    if char in ABOVE_GROUND_CHARS:
+        return "st"
+    if char in SURFACE_CHARS:
+        return "su"
+    if char in SOIL_CHARS:
+        return "so"
+    return "tu"
+
+
+@lru_cache(maxsize=16)
+def variety_styles(variety: str) -> Tuple[Dict[str, str], str]:
+    """Build the class names and stylesheet for a variety, once per variety"""
+    colors = VARIETY_COLORS.get(variety, VARIETY_COLORS["russet"])
+    prefix = "".join(c if c.isalnum() else "-" for c in variety.lower())
+    classes = {category: f"{prefix}-{category}" for category in STYLE_CATEGORIES}
+    css = "".join(f".{classes[c]}{{fill:{colors[c]};color:{colors[c]}}}"
+                  for c in STYLE_CATEGORIES)
+    return classes, css
+
+
+def style_runs(row: str) -> Iterator[Tuple[int, str, str]]:
+    """Split a row into maximal (column, category, text) runs
+
+    Spaces are invisible, so a run keeps absorbing them as long as the next
+    visible glyph has the same category. Leading and trailing spaces are
+    never part of a run.
+    """
+    start = None
+    category = None
+    end = 0
+    for col, char in enumerate(row):
+        cat = glyph_category(char)
+        if cat is None:
+            continue
+        if cat != category:
+            if category is not None:
+                yield start, category, row[start:end]
+            start, category = col, cat
+        end = col + 1
+    if category is not None:
+        yield start, category, row[start:end]
+
+
+Panels = List[Tuple[int, Optional[int], Dict[str, str]]]
+
+
+def panel_styles(engine) -> Tuple[Panels, str]:
+    """Column spans of each panel with its variety's classes, plus the stylesheet
+    
+    A side-by-side engine gets one span per panel, each including the
+    separator that follows it, so no run crosses from one variety into the
+    next.
+    """
+    panels = getattr(engine, "panels", [engine])
+    offsets = getattr(engine, "offsets", [0])
+    spans = []
+    sheets = {}
+    for i, panel in enumerate(panels):
+        variety = panel.config.variety
+        classes, sheets[variety] = variety_styles(variety)
+        end = offsets[i + 1] if i + 1 < len(offsets) else None
+        spans.append((offsets[i], end, classes))
+    return spans, "".join(sheets.values())
+
+
+def panel_runs(line: str, panels: Panels) -> Iterator[Tuple[int, str, str]]:
+    """Split a row into (column, class, text) runs, styled by the panel they fall in"""
+    for start, end, classes in panels:
+        for col, category, text in style_runs(line[start:end]):
+            yield start + col, classes[category], text
+
+
+def _svg_rows(out: TextIO, frame: str, panels: Panels):
+    """Write a frame as SVG text runs"""
+    for row, line in enumerate(frame.split("\n")):
+        y = round(row * LINE_HEIGHT + 1, 2)
+        for col, cls, text in panel_runs(line, panels):
+            out.write(f'<text x="{round(col * CELL_WIDTH, 2)}" y="{y}" '
+                      f'textLength="{round(len(text) * CELL_WIDTH, 2)}" '
+                      f'class="{cls}">{escape(text)}</text>')
+        out.write("\n")
+
+
+def _svg_open(out: TextIO, engine, extra_css: str = ""):
+    width = round(engine_width(engine) * CELL_WIDTH, 2)
+    height = round(engine.config.canvas_height * LINE_HEIGHT + 0.4, 2)
+    panels, css = panel_styles(engine)
+    out.write('<svg xmlns="http://www.w3.org/2000/svg" '
+              f'viewBox="0 0 {width} {height}" font-family="monospace" font-size="1" '
+              'xml:space="preserve">\n')
+    out.write(f'<style>{css}{extra_css}</style>\n')
+    out.write('<rect width="100%" height="100%" fill="#101418"/>\n')
+    return panels
+
+
+def engine_width(engine) -> int:
+    """Canvas width of a single or side-by-side engine"""
+    return getattr(engine, "width", engine.config.canvas_width)
+
+
+def export_stage_svg(engine, stage: GrowthStage, out: TextIO):
+    """Stream a single stage as a static SVG document"""
+    panels = _svg_open(out, engine)
+    _svg_rows(out, engine.render_frame(stage), panels)
+    out.write("</svg>\n")
+
+
+def export_animation_svg(engine, out: TextIO):
+    """Stream every stage as one looping SMIL-animated SVG document"""
+    panels = _svg_open(out, engine)
+    stages = engine.stages
+    count = len(stages)
+    total = max(engine.config.growth_speed, 0.01) * count
+    for i, stage in enumerate(stages):
+        out.write(f'<g visibility="hidden"><title>{stage.value}</title>')
+        out.write(f'<animate attributeName="visibility" values="hidden;visible;hidden" '
+                  f'keyTimes="0;{round(i / count, 4)};{round((i + 1) / count, 4)}" '
+                  f'calcMode="discrete" dur="{round(total, 3)}s" repeatCount="indefinite"/>\n')
+        _svg_rows(out, engine.render_frame(stage), panels)
+        out.write("</g>\n")
+    out.write("</svg>\n")
+
+
+def _html_rows(out: TextIO, frame: str, panels: Panels):
+    """Write a frame as preformatted text with one span per styled run"""
+    for row, line in enumerate(frame.split("\n")):
+        if row:
+            out.write("\n")
+        pos = 0
+        for col, cls, text in panel_runs(line, panels):
+            out.write(line[pos:col])
+            out.write(f'<span class="{cls}">{escape(text)}</span>')
+            pos = col + len(text)
+        out.write(line[pos:].rstrip(" "))
+
+
+def _html_open(out: TextIO, engine, title: str, extra_css: str = ""):
+    panels, css = panel_styles(engine)
+    out.write('<!DOCTYPE html>\n<html><head><meta charset="utf-8">')
+    out.write(f'<title>{escape(title)}</title><style>'
+              'body{background:#101418;color:#ddd;font-family:monospace}'
+              'pre{margin:0;line-height:1.2}'
+              f'{css}{extra_css}</style></head><body>\n')
+    return panels
+
+
+def export_stage_html(engine, stage: GrowthStage, out: TextIO):
+    """Stream a single stage as a self-contained HTML document"""
+    panels = _html_open(out, engine, f"Potato Growth - {stage.value.title()}")
+    out.write(f'<h1>{escape(stage.value.title())}</h1>\n<pre>')
+    _html_rows(out, engine.render_frame(stage), panels)
+    out.write("</pre>\n</body></html>\n")
+
+
+def export_animation_html(engine, out: TextIO):
+    """Stream every stage as a self-contained HTML page animated with CSS keyframes"""
+    stages = engine.stages
+    count = len(stages)
+    total = max(engine.config.growth_speed, 0.01) * count
+    shown = round(100 / count, 4)
+    css = ('.stage{position:absolute;top:0;left:0;visibility:hidden;'
+           f'animation:potato-stage {round(total, 3)}s step-end infinite}}'
+           f'@keyframes potato-stage{{0%{{visibility:visible}}{shown}%{{visibility:hidden}}}}'
+           '.field{position:relative}')
+    panels = _html_open(out, engine, "Potato Growth Animation", css)
+    out.write('<div class="field">\n')
+    for i, stage in enumerate(stages):
+        delay = round(i * total / count, 3)
+        out.write(f'<div class="stage" style="animation-delay:{delay}s">'
+                  f'<div>Growth Stage: {escape(stage.value.title())}</div><pre>')
+        _html_rows(out, engine.render_frame(stage), panels)
+        out.write("</pre></div>\n")
+    out.write("</div>\n</body></html>\n")
+
+
+EXPORTERS = {
+    "svg": export_animation_svg,
+    "html": export_animation_html,
+}
+
+
+def export_animation(engine, output_format: str, filename: Optional[str] = None) -> str:
+    """Write the whole animation in the given format and return the file name"""
+    exporter = EXPORTERS[output_format]
+    filename = filename or f"potato_growth.{output_format}"
+    
+    def write(path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            exporter(engine, f)
+    
+    cached_export(engine, output_format, filename, write)
+    return filename
@@ -0,0 +1,407 @@
+"""
+Cross-process frame cache backed by POSIX shared memory.
+Several potato players on one host render each (variety, stage, size) frame
+once; every other process maps the same segment, and terminal players write
+it straight from the mapping without decoding it.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX platforms cannot share the index safely
+    fcntl = None
+
+
+MAGIC = b"PTF1"
+HEADER = struct.Struct("4sIII")        # magic, version, slot count, pid slots
+PID = struct.Struct("q")
+SLOT = struct.Struct("16sQqQB7x")      # key, generation, owner pid, length, state
+MAX_PIDS = 64
+
+EMPTY, RENDERING, READY = 0, 1, 2
+
+
+def _open_segment(name: str, create: bool = False, size: int = 0) -> shared_memory.SharedMemory:
+    """Open a segment that outlives this process unless explicitly unlinked
+
+    The stdlib resource tracker would unlink every segment a process touched
+    when it exits, pulling frames out from under the other players, so the
+    cache does its own bookkeeping instead.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    except TypeError:  # Python < 3.13 has no track argument
+        shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        from multiprocessing import resource_tracker
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+
+def _unlink_segment(name: str):
+    """Remove a segment by name
+
+    SharedMemory.unlink() would also unregister the segment from the
+    resource tracker, which _open_segment has already done, so the tracker
+    reports a KeyError for every segment. Unlink it directly instead.
+    """
+    try:
+        import _posixshmem
+    except ImportError:  # Windows frees a segment with its last handle
+        return
+    try:
+        _posixshmem.shm_unlink(name if name.startswith("/") else "/" + name)
+    except FileNotFoundError:
+        pass
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedFrameCache:
+    """Shared-memory frame cache with a small index of generation-counted slots
+
+    The index segment holds a header, the pids of attached processes and a
+    fixed table of slots. Each slot names a data segment by slot number and
+    generation; replacing a slot bumps its generation so stale readers can
+    tell. All index updates happen under an flock on a per-namespace lock
+    file. Slots left half-rendered by a dead process are reclaimed by the
+    next process that needs them, and the last process to close (or the
+    first to open after everyone crashed) removes the leftover segments.
+    """
+
+    def __init__(self, namespace: str = "potato", slots: int = 256, poll_interval: float = 0.005):
+        if fcntl is None:
+            raise RuntimeError("SharedFrameCache requires a POSIX platform")
+        self.namespace = namespace
+        self.poll_interval = poll_interval
+        self.pid = os.getpid()
+        self._attached: Dict[bytes, Tuple[int, int, shared_memory.SharedMemory, int]] = {}
+        self._engine_keys = weakref.WeakKeyDictionary()
+        self._thread_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        lock_path = os.path.join(tempfile.gettempdir(), f"potato-shm-{namespace}.lock")
+        self._lock_fd = os.open(lock_path, os.O_CREAT | os.O_RDWR, 0o600)
+        with self._locked():
+            try:
+                self._index = _open_segment(self._index_name())
+            except FileNotFoundError:
+                size = HEADER.size + MAX_PIDS * PID.size + slots * SLOT.size
+                self._index = _open_segment(self._index_name(), create=True, size=size)
+                HEADER.pack_into(self._index.buf, 0, MAGIC, 1, slots, MAX_PIDS)
+            magic, _, self.slots, _ = HEADER.unpack_from(self._index.buf, 0)
+            if magic != MAGIC:
+                raise RuntimeError(f"Shared frame cache index {self._index_name()} is not ours")
+            if not self._live_pids():
+                self._reset_slots()  # leftovers from processes that all crashed
+            self._register_pid()
+
+    def _index_name(self) -> str:
+        return f"ptf_{self.namespace}_idx"
+
+    def _segment_name(self, slot: int, generation: int) -> str:
+        return f"ptf_{self.namespace}_{slot}_{generation}"
+
+    def _pid_offset(self, i: int) -> int:
+        return HEADER.size + i * PID.size
+
+    def _slot_offset(self, slot: int) -> int:
+        return HEADER.size + MAX_PIDS * PID.size + slot * SLOT.size
+
+    def _read_slot(self, slot: int) -> Tuple[bytes, int, int, int, int]:
+        return SLOT.unpack_from(self._index.buf, self._slot_offset(slot))
+
+    def _write_slot(self, slot: int, key: bytes, generation: int, owner: int, length: int, state: int):
+        SLOT.pack_into(self._index.buf, self._slot_offset(slot), key, generation, owner, length, state)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        # flock only excludes other processes, so threads queue on a mutex first
+        with self._thread_lock:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _live_pids(self) -> List[int]:
+        """Attached pids, clearing entries of processes that have died"""
+        live = []
+        for i in range(MAX_PIDS):
+            (pid,) = PID.unpack_from(self._index.buf, self._pid_offset(i))
+            if pid and not _pid_alive(pid):
+                PID.pack_into(self._index.buf, self._pid_offset(i), 0)
+            elif pid:
+                live.append(pid)
+        return live
+
+    def _register_pid(self):
+        for i in range(MAX_PIDS):
+            (pid,) = PID.unpack_from(self._index.buf, self._pid_offset(i))
+            if pid == 0:
+                PID.pack_into(self._index.buf, self._pid_offset(i), self.pid)
+                return
+        # More players than pid slots: still usable, just never the last one out
+
+    def _unregister_pid(self):
+        for i in range(MAX_PIDS):
+            (pid,) = PID.unpack_from(self._index.buf, self._pid_offset(i))
+            if pid == self.pid:
+                PID.pack_into(self._index.buf, self._pid_offset(i), 0)
+
+    def _reset_slots(self):
+        for slot in range(self.slots):
+            key, generation, _, _, state = self._read_slot(slot)
+            if state != EMPTY:
+                _unlink_segment(self._segment_name(slot, generation))
+                self._write_slot(slot, b"\0" * 16, generation + 1, 0, 0, EMPTY)
+
+    def frame_key(self, engine, stage) -> bytes:
+        """Digest identifying one frame of one engine's patterns and canvas size"""
+        base = self._engine_keys.get(engine)
+        if base is None:
+            fingerprint = engine.cache_fingerprint()
+            text = json.dumps([fingerprint["renderer"], fingerprint["patterns"],
+                               engine.config.canvas_width, engine.config.canvas_height],
+                              sort_keys=True, ensure_ascii=False)
+            base = hashlib.sha256(text.encode("utf-8"))
+            self._engine_keys[engine] = base
+        digest = base.copy()
+        digest.update(stage.value.encode("utf-8"))
+        return digest.digest()[:16]
+
+    def get_frame(self, engine, stage) -> memoryview:
+        """Return the UTF-8 frame for an engine and stage as a read-only shared view
+
+        The first process to ask renders the frame straight into a new
+        segment with ``engine.render_into``; everyone else maps it.
+        """
+        key = self.frame_key(engine, stage)
+        with self._thread_lock:
+            local = self._attached.get(key)
+            if local is not None:
+                slot, generation, shm, length = local
+                slot_key, slot_generation, _, _, state = self._read_slot(slot)
+                if slot_key == key and slot_generation == generation and state == READY:
+                    self.hits += 1
+                    return shm.buf[:length].toreadonly()
+                self._detach(key)
+
+        while True:
+            with self._locked():
+                slot, claim = self._find_slot(key)
+                _, generation, owner, length, state = self._read_slot(slot)
+                if state == READY and not claim:
+                    shm = _open_segment(self._segment_name(slot, generation))
+                    if not _pid_alive(owner):
+                        self._write_slot(slot, key, generation, self.pid, length, READY)
+                    self.hits += 1
+                    return self._attach(key, slot, generation, shm, length)
+                if claim:
+                    if state != EMPTY:
+                        _unlink_segment(self._segment_name(slot, generation))
+                    generation += 1
+                    self._write_slot(slot, key, generation, self.pid, 0, RENDERING)
+                    break
+            time.sleep(self.poll_interval)  # another live process is rendering it
+
+        self.misses += 1
+        try:
+            shm = _open_segment(self._segment_name(slot, generation), create=True,
+                                size=engine.frame_buffer_size())
+            length = engine.render_into(shm.buf, stage)
+        except BaseException:
+            with self._locked():
+                self._write_slot(slot, b"\0" * 16, generation, 0, 0, EMPTY)
+            _unlink_segment(self._segment_name(slot, generation))
+            raise
+        with self._locked():
+            self._write_slot(slot, key, generation, self.pid, length, READY)
+            return self._attach(key, slot, generation, shm, length)
+
+    def _find_slot(self, key: bytes) -> Tuple[int, bool]:
+        """Locate the slot for a key; the flag says this process must render it
+
+        Probes linearly from the key's home slot. A half-rendered slot whose
+        owner died is reclaimed; if the table is full a finished slot is
+        evicted, and if every slot is mid-render the caller has to wait.
+        """
+        home = int.from_bytes(key[:4], "little") % self.slots
+        free = None
+        for i in range(self.slots):
+            slot = (home + i) % self.slots
+            slot_key, _, owner, _, state = self._read_slot(slot)
+            if state == EMPTY:
+                if free is None:
+                    free = slot
+                break
+            if slot_key == key:
+                if state == RENDERING and not _pid_alive(owner):
+                    return slot, True
+                return slot, False
+        if free is not None:
+            return free, True
+        # Table full: evict the first finished slot, never one mid-render
+        for i in range(self.slots):
+            slot = (home + i) % self.slots
+            if self._read_slot(slot)[4] == READY:
+                return slot, True
+        return home, False
+
+    # _attach and _detach expect the caller to hold _thread_lock
+
+    def _attach(self, key: bytes, slot: int, generation: int,
+                shm: shared_memory.SharedMemory, length: int) -> memoryview:
+        self._detach(key)  # another thread may have mapped an older copy
+        self._attached[key] = (slot, generation, shm, length)
+        return shm.buf[:length].toreadonly()
+
+    def _detach(self, key: bytes):
+        entry = self._attached.pop(key, None)
+        if entry is None:
+            return
+        shm = entry[2]
+        try:
+            shm.close()
+        except BufferError:
+            pass  # a caller still holds a view; the mapping goes when it does
+
+    def stats(self) -> Dict[str, int]:
+        """Hit, miss and attachment counts for this process"""
+        return {"hits": self.hits, "misses": self.misses, "attached": len(self._attached)}
+
+    def close(self):
+        """Detach from the cache; the last live process removes every segment"""
+        if self._lock_fd is None:
+            return
+        with _caches_lock:
+            if _caches.get(self.namespace) is self:
+                del _caches[self.namespace]
+        with self._thread_lock:
+            for key in list(self._attached):
+                self._detach(key)
+        with self._locked():
+            self._unregister_pid()
+            last = not self._live_pids()
+            if last:
+                self._reset_slots()
+        try:
+            self._index.close()
+        except BufferError:
+            pass
+        if last:
+            _unlink_segment(self._index_name())
+        os.close(self._lock_fd)
+        self._lock_fd = None
+
+    def __enter__(self) -> "SharedFrameCache":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_caches: Dict[str, SharedFrameCache] = {}
+_caches_lock = threading.Lock()
+
+
+def shared_frame_cache(namespace: str) -> SharedFrameCache:
+    """Get this process's cache for a namespace, closed automatically at exit"""
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = _caches[namespace] = SharedFrameCache(namespace)
+            atexit.register(cache.close)
+        return cache
+
+
+def _pss_bytes() -> int:
+    """Proportional set size, which splits shared pages between their users"""
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def _benchmark_worker(namespace: Optional[str], rounds: int, queue):
+    """Play a fixed workload to the null device, optionally through the shared cache"""
+    import resource
+    from potato import AnimationEngine, FramePacer, GrowthStage, PotatoConfig, current_rss_bytes
+    from potato_varieties import list_varieties
+
+    engines = [AnimationEngine(PotatoConfig(variety=v, canvas_width=w, canvas_height=h,
+                                            shared_cache=namespace))
+               for v in list_varieties() for w, h in [(80, 40), (200, 60)]]
+    with open(os.devnull, "w", encoding="utf-8") as out:
+        pacer = FramePacer(out, 0.0, slow_write_threshold=float("inf"))
+        for _ in range(rounds):
+            for engine in engines:
+                for stage in GrowthStage:
+                    engine.write_terminal_frame(pacer, stage)
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    queue.put((current_rss_bytes(), _pss_bytes(), usage.ru_utime + usage.ru_stime,
+               pacer.metrics.bytes_written))
+    if namespace:
+        shared_frame_cache(namespace).close()  # worker processes skip atexit
+
+
+def benchmark(processes: int = 4, rounds: int = 20) -> Dict[str, Dict[str, float]]:
+    """Compare total RSS and CPU of N players with and without the shared cache"""
+    import multiprocessing
+
+    results = {}
+    for label, namespace in (("private", None), ("shared", f"bench{os.getpid()}")):
+        queue = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=_benchmark_worker, args=(namespace, rounds, queue))
+                   for _ in range(processes)]
+        for w in workers:
+            w.start()
+        reports = [queue.get() for _ in workers]
+        for w in workers:
+            w.join()
+        results[label] = {
+            "total_rss_mb": round(sum(r[0] for r in reports) / 1024 / 1024, 1),
+            "total_pss_mb": round(sum(r[1] for r in reports) / 1024 / 1024, 1),
+            "total_cpu_s": round(sum(r[2] for r in reports), 3),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Benchmark the shared-memory frame cache")
+    parser.add_argument("--processes", "-n", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.processes, args.rounds), indent=2))
@@ -0,0 +1,255 @@
+"""
+Persistent simulation state for potato growth runs.
+Stage transitions and periodic checkpoints are kept in SQLite so a long
+simulation can resume after a crash and its history can be queried by plant,
+stage and time.
+"""
+
+import json
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from potato_varieties import STAGE_KEYS
+
+
+SCHEMA_VERSION = 1
+OPEN_END = 1e30  # stands in for "still in this stage" in the span index
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    config TEXT
+);
+CREATE TABLE IF NOT EXISTS transitions (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    plant_id INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    t_start REAL NOT NULL,
+    t_end REAL
+);
+CREATE INDEX IF NOT EXISTS ix_transitions_plant ON transitions (run_id, plant_id, t_start);
+CREATE VIRTUAL TABLE IF NOT EXISTS transition_spans USING rtree (
+    id, stage_lo, stage_hi, t_lo, t_hi,
+    +run_id TEXT, +plant_id INTEGER, +t_start REAL, +t_end REAL
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    run_id TEXT NOT NULL,
+    t REAL NOT NULL,
+    state TEXT NOT NULL,
+    last_id INTEGER NOT NULL,
+    PRIMARY KEY (run_id, t)
+);
+"""
+
+
+class RunMismatchError(ValueError):
+    """A run id already in the store belongs to a different simulation"""
+
+
+def _stage_key(stage) -> str:
+    return stage.value if hasattr(stage, 'value') else stage
+
+
+class SimulationStore:
+    """SQLite store of stage transitions and simulation checkpoints
+
+    The database runs in WAL mode so readers can query while a simulation
+    writes. Transitions are buffered and written in one transaction per
+    batch; each row is a span [t_start, t_end) a plant spent in a stage,
+    mirrored into an R*Tree so "which plants were at stage S at time t"
+    only visits spans that overlap t. The R*Tree keeps 32-bit bounds, so
+    it also carries the exact times to filter its candidates.
+    """
+
+    def __init__(self, path: str, batch_size: int = 10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self.conn.commit()
+
+        (last_id,) = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM transitions").fetchone()
+        self._next_id = last_id + 1
+        self._inserts: Dict[int, List[Any]] = {}
+        self._closes: List[Tuple[float, int]] = []
+        self._open: Dict[Tuple[str, int], int] = {}
+        self._open_loaded = set()
+
+    def start_run(self, run_id: str, config: Optional[Dict[str, Any]] = None):
+        """Register a run, keeping the original record if it already exists"""
+        self.conn.execute("INSERT OR IGNORE INTO runs (run_id, created, config) VALUES (?, ?, ?)",
+                          (run_id, time.time(), json.dumps(config) if config is not None else None))
+        self.conn.commit()
+
+    def run_config(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """The config a run was started with, if the run exists and recorded one"""
+        row = self.conn.execute("SELECT config FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    def _load_open(self, run_id: str):
+        """Pick up the spans a previous process left open for a run"""
+        if run_id in self._open_loaded:
+            return
+        for span_id, plant_id in self.conn.execute(
+                "SELECT id, plant_id FROM transitions WHERE run_id = ? AND t_end IS NULL", (run_id,)):
+            self._open[(run_id, plant_id)] = span_id
+        self._open_loaded.add(run_id)
+
+    def record_transition(self, run_id: str, plant_id: int, stage, t: float):
+        """Buffer the moment a plant entered a stage"""
+        self._load_open(run_id)
+        previous = self._open.get((run_id, plant_id))
+        if previous is not None:
+            pending = self._inserts.get(previous)
+            if pending is not None:
+                pending[5] = t
+            else:
+                self._closes.append((t, previous))
+
+        span_id = self._next_id
+        self._next_id += 1
+        self._inserts[span_id] = [span_id, run_id, plant_id, _stage_key(stage), t, None]
+        self._open[(run_id, plant_id)] = span_id
+        if len(self._inserts) + len(self._closes) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write buffered transitions in a single transaction"""
+        if not self._inserts and not self._closes:
+            return
+        rows = list(self._inserts.values())
+        index = {key: i for i, key in enumerate(STAGE_KEYS)}
+        spans = [(r[0], index.get(r[3], -1), index.get(r[3], -1), r[4],
+                  OPEN_END if r[5] is None else r[5], r[1], r[2], r[4], r[5]) for r in rows]
+        with self.conn:
+            self.conn.executemany("INSERT INTO transitions (id, run_id, plant_id, stage, t_start, t_end) "
+                                  "VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self.conn.executemany("INSERT INTO transition_spans VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                  spans)
+            self.conn.executemany("UPDATE transitions SET t_end = ? WHERE id = ?", self._closes)
+            self.conn.executemany("UPDATE transition_spans SET t_hi = ?1, t_end = ?1 WHERE id = ?2",
+                                  self._closes)
+        self._inserts.clear()
+        self._closes.clear()
+
+    def checkpoint(self, run_id: str, t: float, state: Dict[str, Any]):
+        """Flush pending transitions and save the simulation state at time t
+
+        The checkpoint remembers the last transition written, which is what
+        resume() rolls back to.
+        """
+        self.flush()
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO checkpoints (run_id, t, state, last_id) "
+                              "VALUES (?, ?, ?, ?)",
+                              (run_id, t, json.dumps(state), self._next_id - 1))
+
+    def latest_checkpoint(self, run_id: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """The most recent checkpoint of a run, if any"""
+        row = self._latest_checkpoint(run_id)
+        return (row[0], json.loads(row[1])) if row else None
+
+    def _latest_checkpoint(self, run_id: str) -> Optional[Tuple[float, str, int]]:
+        return self.conn.execute("SELECT t, state, last_id FROM checkpoints WHERE run_id = ? "
+                                 "ORDER BY t DESC LIMIT 1", (run_id,)).fetchone()
+
+    def resume(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Roll a run back to its last checkpoint and return that state
+
+        Transitions written after the checkpoint are discarded and each
+        plant's latest remaining span is reopened, so replaying from the
+        checkpoint records each transition exactly once.
+        """
+        self.flush()
+        latest = self._latest_checkpoint(run_id)
+        if latest is None:
+            return None
+        _, state, last_id = latest
+        with self.conn:
+            self.conn.execute("DELETE FROM transition_spans WHERE id IN "
+                              "(SELECT id FROM transitions WHERE run_id = ? AND id > ?)",
+                              (run_id, last_id))
+            self.conn.execute("DELETE FROM transitions WHERE run_id = ? AND id > ?", (run_id, last_id))
+            reopen = [span_id for (span_id,) in self.conn.execute(
+                "SELECT id FROM transitions WHERE t_end IS NOT NULL AND id IN "
+                "(SELECT MAX(id) FROM transitions WHERE run_id = ? GROUP BY plant_id)", (run_id,))]
+            self.conn.executemany("UPDATE transitions SET t_end = NULL WHERE id = ?",
+                                  [(span_id,) for span_id in reopen])
+            self.conn.executemany("UPDATE transition_spans SET t_hi = ?, t_end = NULL WHERE id = ?",
+                                  [(OPEN_END, span_id) for span_id in reopen])
+        self._open = {key: span for key, span in self._open.items() if key[0] != run_id}
+        self._open_loaded.discard(run_id)
+        return json.loads(state)
+
+    def plants_at(self, run_id: str, stage, t: float) -> List[int]:
+        """Plants that were in a stage at time t"""
+        self.flush()
+        stage_key = _stage_key(stage)
+        position = STAGE_KEYS.index(stage_key) if stage_key in STAGE_KEYS else -1
+        rows = self.conn.execute(
+            "SELECT plant_id FROM transition_spans "
+            "WHERE stage_lo <= ?1 AND stage_hi >= ?1 AND t_lo <= ?2 AND t_hi >= ?2 "
+            "AND run_id = ?3 AND t_start <= ?2 AND (t_end IS NULL OR t_end > ?2) "
+            "ORDER BY plant_id",
+            (position, t, run_id))
+        return [plant_id for (plant_id,) in rows]
+
+    def history(self, run_id: str, plant_id: int) -> List[Tuple[str, float, Optional[float]]]:
+        """Every (stage, t_start, t_end) span of one plant, in order"""
+        self.flush()
+        return self.conn.execute("SELECT stage, t_start, t_end FROM transitions "
+                                 "WHERE run_id = ? AND plant_id = ? ORDER BY t_start, id",
+                                 (run_id, plant_id)).fetchall()
+
+    def close(self):
+        """Flush and close the database"""
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self) -> "SimulationStore":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def benchmark(path: str, plants: int = 100000, run_id: str = "bench") -> Dict[str, float]:
+    """Record a full season for many plants, then time point-in-time stage queries"""
+    import random
+
+    rng = random.Random(0)
+    store = SimulationStore(path)
+    store.start_run(run_id)
+    start = time.perf_counter()
+    for plant_id in range(plants):
+        t = rng.uniform(0, 100)
+        for stage in STAGE_KEYS:
+            store.record_transition(run_id, plant_id, stage, t)
+            t += rng.uniform(1, 20)
+    store.flush()
+    write_s = time.perf_counter() - start
+
+    queries = 50
+    start = time.perf_counter()
+    for _ in range(queries):
+        store.plants_at(run_id, "flowering", rng.uniform(0, 200))
+    query_ms = (time.perf_counter() - start) / queries * 1000
+    store.close()
+    return {"transitions": plants * len(STAGE_KEYS), "write_s": round(write_s, 2),
+            "query_ms": round(query_ms, 2)}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the simulation state store")
+    parser.add_argument("path", help="SQLite database to create")
+    parser.add_argument("--plants", type=int, default=100000)
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.path, args.plants), indent=2))
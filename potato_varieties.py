@@ -3,12 +3,21 @@ Potato variety definitions and ASCII art patterns.
 This module provides different potato varieties with unique visual characteristics.
 """
 
-from typing import Dict, List
+import random
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
 
 class PotatoVariety:
     """Base class for potato varieties"""
     
+    # Time spent in each stage as a multiple of the base growth speed,
+    # keyed like the patterns; stages not listed take one growth step
+    stage_durations: Dict[str, float] = {}
+    
+    # Whether the constructor takes variety_params; fixed varieties ignore them
+    accepts_params: bool = False
+    
     def __init__(self, name: str):
         self.name = name
         self.patterns = self._define_patterns()
@@ -22,11 +31,18 @@ class PotatoVariety:
         # Handle both enum and string stage inputs
         stage_key = stage.value if hasattr(stage, 'value') else stage
         return self.patterns.get(stage_key, ["?"])
+    
+    def get_duration(self, stage) -> float:
+        """Get the time spent in a stage as a multiple of the growth speed"""
+        stage_key = stage.value if hasattr(stage, 'value') else stage
+        return self.stage_durations.get(stage_key, 1.0)
 
 
 class RussetPotato(PotatoVariety):
     """Classic russet potato variety"""
     
+    stage_durations = {"tuber_bulking": 1.5, "maturity": 1.25}
+    
     def __init__(self):
         super().__init__("russet")
     
@@ -134,6 +150,8 @@ class RussetPotato(PotatoVariety):
 class YukonGoldPotato(PotatoVariety):
     """Yukon Gold potato variety with yellow characteristics"""
     
+    stage_durations = {"tuber_bulking": 0.75, "maturity": 0.75}
+    
     def __init__(self):
         super().__init__("yukon_gold")
     
@@ -229,6 +247,8 @@ class YukonGoldPotato(PotatoVariety):
 class RedPotato(PotatoVariety):
     """Red potato variety with distinctive red skin"""
     
+    stage_durations = {"early_tuber": 0.8}
+    
     def __init__(self):
         super().__init__("red")
     
@@ -324,6 +344,8 @@ class RedPotato(PotatoVariety):
 class FingerlingPotato(PotatoVariety):
     """Small fingerling potato variety"""
     
+    stage_durations = {"flowering": 1.5, "tuber_formation": 1.25}
+    
     def __init__(self):
         super().__init__("fingerling")
     
@@ -416,18 +438,124 @@ class FingerlingPotato(PotatoVariety):
         }
 
 
+STAGE_KEYS = (
+    "seed", "germination", "sprouting", "early_vegetative", "vegetative",
+    "root_development", "flowering", "early_tuber", "tuber_formation",
+    "tuber_bulking", "maturity", "harvest_ready",
+)
+
+# flower, left leaf, stem, right leaf, tuber, young tuber, soil
+DEFAULT_PALETTE = "❀\\|/●○░"
+
+
+@lru_cache(maxsize=4096)
+def generate_sprite(stage_key: str, scale: int, stem_height: int, tuber_count: int,
+                    palette: str, seed: int) -> Tuple[str, ...]:
+    """Generate the pattern for one stage from plant parameters
+    
+    Results are memoized, so a field of plants sharing parameters generates
+    each distinct sprite only once.
+    """
+    flower, leaf_l, stem, leaf_r, tuber, young, soil = palette
+    index = STAGE_KEYS.index(stage_key)
+    rng = random.Random(f"{seed}:{stage_key}")
+    spread = 2 * scale + 1
+    lines = []
+    
+    # Foliage: flowers over a fan of leaves over the stem
+    if index >= STAGE_KEYS.index("flowering"):
+        gaps = [" " * rng.randint(1, 2) for _ in range(spread - 1)]
+        lines.append(flower + "".join(gap + flower for gap in gaps))
+    if index >= STAGE_KEYS.index("vegetative"):
+        for level in range(scale):
+            inner = " " * (scale - level - 1)
+            lines.append(leaf_l + inner + stem + inner + leaf_r)
+    if index == STAGE_KEYS.index("germination"):
+        lines.append(leaf_r)
+    elif index >= STAGE_KEYS.index("sprouting"):
+        growth = min(index - 1, 3) / 3
+        lines.extend([stem] * max(1, round(stem_height * scale * growth)))
+    
+    # Seed piece, widening as the plant establishes
+    lines.append(tuber * min(1 + index // 2, spread))
+    
+    # Roots and tubers below the seed piece
+    if index >= STAGE_KEYS.index("root_development"):
+        lines.append(soil + "╱" + " " * (scale - 1) + "╲" + soil)
+    mature_from = {"early_tuber": 0.0, "tuber_formation": 0.0, "tuber_bulking": 0.5,
+                   "maturity": 1.0, "harvest_ready": 1.0}
+    share = {"early_tuber": 0.25, "tuber_formation": 0.5, "tuber_bulking": 0.75,
+             "maturity": 1.0, "harvest_ready": 1.0}
+    if stage_key in share:
+        count = max(1, round(tuber_count * share[stage_key]))
+        tubers = [tuber if rng.random() < mature_from[stage_key] else young for _ in range(count)]
+        per_row = spread + 2
+        for start in range(0, count, per_row):
+            lines.append(soil + "".join(tubers[start:start + per_row]) + soil)
+    
+    lines.append(soil * (spread + 4))
+    return tuple(lines)
+
+
+def _whole_number(name: str, value) -> int:
+    """Accept ints and integral floats (as JSON may produce) for a sprite parameter"""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"{name} must be a whole number, not {value!r}")
+    return value
+
+
+class ProceduralPotato(PotatoVariety):
+    """Variety whose stage sprites are generated from parameters
+    
+    The palette is seven glyphs: flower, left leaf, stem, right leaf, tuber,
+    young tuber and soil. Foliage glyphs must be ones the renderer treats as
+    above ground for the plant to sit on the soil line.
+    """
+    
+    accepts_params = True
+    
+    def __init__(self, scale: int = 1, stem_height: int = 2, tuber_count: int = 4,
+                 palette: str = DEFAULT_PALETTE, seed: int = 0, name: str = "procedural"):
+        scale = _whole_number("scale", scale)
+        stem_height = _whole_number("stem_height", stem_height)
+        tuber_count = _whole_number("tuber_count", tuber_count)
+        seed = _whole_number("seed", seed)
+        if isinstance(palette, (list, tuple)) and all(isinstance(g, str) for g in palette):
+            palette = "".join(palette)  # JSON configs may list the glyphs
+        if not isinstance(palette, str):
+            raise ValueError(f"palette must be a string of glyphs, not {palette!r}")
+        if scale < 1 or stem_height < 1 or tuber_count < 1:
+            raise ValueError("scale, stem_height and tuber_count must be at least 1")
+        if len(palette) != 7:
+            raise ValueError("palette must have exactly seven glyphs")
+        self.params = (scale, stem_height, tuber_count, palette, seed)
+        super().__init__(name)
+    
+    def _define_patterns(self) -> Dict[str, List[str]]:
+        return {key: list(generate_sprite(key, *self.params)) for key in STAGE_KEYS}
+
+
 # Variety registry
 POTATO_VARIETIES = {
     "russet": RussetPotato,
     "yukon_gold": YukonGoldPotato,
     "red": RedPotato,
-    "fingerling": FingerlingPotato
+    "fingerling": FingerlingPotato,
+    "procedural": ProceduralPotato
 }
 
 
-def get_variety(name: str) -> PotatoVariety:
-    """Get a potato variety by name"""
+def get_variety(name: str, params: Optional[Dict[str, Any]] = None) -> PotatoVariety:
+    """Get a potato variety by name, passing constructor parameters to varieties that take them
+    
+    Fixed varieties ignore ``params``, so one set of parameters can be
+    shared by a field that mixes procedural and fixed varieties.
+    """
     variety_class = POTATO_VARIETIES.get(name.lower(), RussetPotato)
+    if params and variety_class.accepts_params:
+        return variety_class(**params)
     return variety_class()
 
 
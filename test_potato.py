@@ -6,8 +6,17 @@ Basic tests for the potato growth simulator
 import unittest
 import tempfile
 import os
-from potato import PotatoConfig, PotatoArt, AnimationEngine, GrowthStage, PotatoGrowthSimulator
-from potato_varieties import get_variety, list_varieties, RussetPotato
+import io
+import time
+import threading
+import json
+import shutil
+from dataclasses import replace
+from potato import PotatoConfig, PotatoArt, AnimationEngine, GrowthStage, PotatoGrowthSimulator, ComparisonEngine, FramePacer, render_batch, GrowthScheduler, Plant, PotatoDaemon, current_rss_bytes, cache_sizes, NdjsonWriter
+from potato_varieties import get_variety, list_varieties, RussetPotato, ProceduralPotato, generate_sprite
+from potato_cache import ExportCache
+from potato_store import SimulationStore
+from potato_export import style_runs, export_animation_svg, export_animation_html, export_stage_svg, export_animation
 
 
 class TestPotatoConfig(unittest.TestCase):
@@ -61,6 +70,77 @@ class TestPotatoVarieties(unittest.TestCase):
                 self.assertGreater(len(pattern), 0)
 
 
+class TestProceduralPotato(unittest.TestCase):
+    def test_registered_with_parameters(self):
+        variety = get_variety('procedural', {'scale': 2, 'seed': 7})
+        self.assertIsInstance(variety, ProceduralPotato)
+        for stage in GrowthStage:
+            pattern = variety.get_pattern(stage)
+            self.assertIsInstance(pattern, list)
+            self.assertGreater(len(pattern), 0)
+    
+    def test_json_parameters_are_normalised(self):
+        listed = ProceduralPotato(scale=2.0, stem_height=3.0, palette=list("❀\\|/●○░"))
+        expected = ProceduralPotato(scale=2, stem_height=3)
+        for stage in GrowthStage:
+            self.assertEqual(listed.get_pattern(stage), expected.get_pattern(stage))
+        for bad in ({'scale': 1.5}, {'stem_height': '2'}, {'palette': 7}, {'seed': True}):
+            with self.assertRaises(ValueError):
+                ProceduralPotato(**bad)
+        self.assertIn('procedural_sprites', cache_sizes())
+    
+    def test_fixed_varieties_ignore_params(self):
+        params = {'scale': 2, 'seed': 7}
+        self.assertIsInstance(get_variety('red', params), type(get_variety('red')))
+        engine = AnimationEngine(PotatoConfig(variety='russet', variety_params=params))
+        self.assertEqual(engine.render_frame(GrowthStage.MATURITY),
+                         AnimationEngine(PotatoConfig()).render_frame(GrowthStage.MATURITY))
+        
+        config = PotatoConfig(canvas_width=24, variety_params=params)
+        scheduler = GrowthScheduler(config, [Plant('procedural'), Plant('red')])
+        self.assertEqual(scheduler.field.panels[0].potato_art.variety_obj.params[0], 2)
+        comparison = ComparisonEngine.for_varieties(config, ['procedural', 'red'])
+        self.assertEqual(scheduler.field.render_frame(GrowthStage.FLOWERING),
+                         comparison.render_frame(GrowthStage.FLOWERING))
+        with self.assertRaises(TypeError):
+            get_variety('procedural', {'size': 2})
+    
+    def test_scale_grows_sprite(self):
+        small = ProceduralPotato(scale=1).get_pattern(GrowthStage.HARVEST_READY)
+        large = ProceduralPotato(scale=3).get_pattern(GrowthStage.HARVEST_READY)
+        self.assertGreater(len(large), len(small))
+        self.assertGreater(max(map(len, large)), max(map(len, small)))
+    
+    def test_seed_is_deterministic(self):
+        a = ProceduralPotato(tuber_count=12, seed=3).patterns
+        self.assertEqual(a, ProceduralPotato(tuber_count=12, seed=3).patterns)
+        self.assertNotEqual(a, ProceduralPotato(tuber_count=12, seed=4).patterns)
+    
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            ProceduralPotato(palette="abc")
+        with self.assertRaises(ValueError):
+            ProceduralPotato(scale=0)
+    
+    def test_field_generates_each_sprite_once(self):
+        generate_sprite.cache_clear()
+        config = PotatoConfig(canvas_width=12, canvas_height=16)
+        plants = [Plant('procedural', params={'scale': 1 + i % 2, 'seed': i % 3})
+                  for i in range(600)]
+        scheduler = GrowthScheduler(config, plants)
+        scheduler.render()
+        info = generate_sprite.cache_info()
+        self.assertEqual(info.misses, 6 * len(GrowthStage))
+    
+    def test_renders_on_large_canvas(self):
+        config = PotatoConfig(canvas_width=120, canvas_height=40, variety='procedural',
+                              variety_params={'scale': 4, 'stem_height': 4, 'tuber_count': 20})
+        frame = AnimationEngine(config).render_frame(GrowthStage.HARVEST_READY)
+        lines = frame.split('\n')
+        self.assertEqual(len(lines), 40)
+        self.assertIn('❀', frame)
+
+
 class TestAnimationEngine(unittest.TestCase):
     def test_render_frame(self):
         config = PotatoConfig()
@@ -87,6 +167,510 @@ class TestAnimationEngine(unittest.TestCase):
         self.assertEqual(len(lines), 30)
         for line in lines:
             self.assertEqual(len(line), 60)
+    
+    def test_iter_frames_is_lazy(self):
+        engine = AnimationEngine(PotatoConfig())
+        frames = engine.iter_frames()
+        first = next(frames)
+        self.assertEqual(first.stage, GrowthStage.SEED)
+        self.assertEqual(engine._sprite_cache, {})
+        self.assertEqual(str(first), engine.render_frame(GrowthStage.SEED))
+        self.assertEqual(len(list(frames)), len(GrowthStage) - 1)
+    
+    def test_render_into_matches_render_frame(self):
+        engine = AnimationEngine(PotatoConfig(variety='yukon_gold'))
+        ring = bytearray(engine.frame_buffer_size() * 2)
+        for stage in GrowthStage:
+            n = engine.render_into(ring, stage, offset=5)
+            self.assertEqual(ring[5:5 + n].decode('utf-8'), engine.render_frame(stage))
+    
+    def test_render_into_rejects_small_buffer(self):
+        engine = AnimationEngine(PotatoConfig())
+        with self.assertRaises(ValueError):
+            engine.render_into(bytearray(10), GrowthStage.MATURITY)
+
+
+class TestComparisonEngine(unittest.TestCase):
+    def test_panels_match_single_renders(self):
+        config = PotatoConfig()
+        varieties = ['russet', 'yukon_gold', 'red', 'fingerling']
+        engine = ComparisonEngine.for_varieties(config, varieties)
+        
+        for stage in GrowthStage:
+            lines = engine.render_frame(stage).split('\n')
+            self.assertEqual(len(lines), config.canvas_height)
+            for variety, offset in zip(varieties, engine.offsets):
+                single = AnimationEngine(PotatoConfig(variety=variety)).render_frame(stage)
+                panel = [line[offset:offset + config.canvas_width] for line in lines]
+                self.assertEqual('\n'.join(panel), single)
+    
+    def test_many_panels_width(self):
+        config = PotatoConfig(canvas_width=12, canvas_height=16)
+        engine = ComparisonEngine.for_varieties(config, ['red'] * 30)
+        for line in engine.render_frame(GrowthStage.HARVEST_READY).split('\n'):
+            self.assertEqual(len(line), engine.width)
+        self.assertEqual(len(engine.render_labels()), engine.width)
+    
+    def test_mismatched_heights_rejected(self):
+        with self.assertRaises(ValueError):
+            ComparisonEngine([PotatoConfig(), PotatoConfig(canvas_height=30)])
+
+
+class SlowStream(io.StringIO):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+    
+    def flush(self):
+        time.sleep(self.delay)
+
+
+class TestFramePacer(unittest.TestCase):
+    def test_fast_stream_writes_full_frames(self):
+        pacer = FramePacer(io.StringIO(), 0.0)
+        for i in range(3):
+            self.assertTrue(pacer.write_frame([f"row {i}", "static"]))
+        self.assertEqual(pacer.metrics.full_frames, 3)
+        self.assertEqual(pacer.metrics.diff_frames, 0)
+        self.assertEqual(pacer.metrics.mode, "full")
+    
+    def test_slow_stream_switches_to_diff(self):
+        stream = SlowStream(0.02)
+        pacer = FramePacer(stream, 0.0, slow_write_threshold=0.01)
+        pacer.write_frame(["a", "static"])
+        self.assertTrue(pacer.backpressure)
+        self.assertEqual(pacer.metrics.mode, "diff")
+        self.assertGreater(pacer.metrics.interval, 0.0)
+        
+        before = len(stream.getvalue())
+        pacer.write_frame(["b", "static"])
+        written = stream.getvalue()[before:]
+        self.assertIn("b", written)
+        self.assertNotIn("static", written)
+        self.assertEqual(pacer.metrics.diff_frames, 1)
+    
+    def test_diff_rows_erase_old_tail(self):
+        stream = SlowStream(0.02)
+        pacer = FramePacer(stream, 0.0, slow_write_threshold=0.01)
+        pacer.write_frame(["Growth Stage: Tuber_Bulking", "static"])
+        before = len(stream.getvalue())
+        pacer.write_frame(["Growth Stage: Maturity", "static"])
+        self.assertEqual(stream.getvalue()[before:], "\033[1;1HGrowth Stage: Maturity\033[K\033[3;1H")
+    
+    def test_mode_recovers_when_stream_is_fast(self):
+        stream = SlowStream(0.02)
+        pacer = FramePacer(stream, 0.0, slow_write_threshold=0.01)
+        pacer.write_frame(["a"])
+        self.assertEqual(pacer.metrics.mode, "diff")
+        stream.delay = 0.0
+        pacer.write_frame(["b"])
+        self.assertFalse(pacer.backpressure)
+        self.assertEqual(pacer.metrics.mode, "full")
+        pacer.write_frame(["c"])
+        self.assertEqual(pacer.metrics.full_frames, 2)
+    
+    def test_keyframes_never_skipped(self):
+        pacer = FramePacer(SlowStream(0.02), 0.0, slow_write_threshold=0.01)
+        pacer.write_frame(["a"])
+        self.assertFalse(pacer.write_frame(["between"], keyframe=False))
+        self.assertTrue(pacer.write_frame(["b"], keyframe=True))
+        self.assertEqual(pacer.metrics.frames_skipped, 1)
+        self.assertEqual(pacer.metrics.frames_written, 2)
+
+
+class TestThreadedRendering(unittest.TestCase):
+    def _requests(self):
+        sizes = [(40, 20), (60, 30), (24, 14)]
+        return [(variety, stage, size)
+                for variety in list_varieties()
+                for stage in GrowthStage
+                for size in sizes] * 4
+    
+    def test_shared_engine_across_threads(self):
+        engine = AnimationEngine(PotatoConfig())
+        expected = {stage: engine.render_frame(stage) for stage in GrowthStage}
+        engine = AnimationEngine(PotatoConfig())
+        mismatches = []
+        
+        def worker():
+            for _ in range(20):
+                for stage in GrowthStage:
+                    if engine.render_frame(stage) != expected[stage]:
+                        mismatches.append(stage)
+        
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(mismatches, [])
+    
+    def test_batch_matches_serial_rendering(self):
+        requests = self._requests()
+        expected = [AnimationEngine(PotatoConfig(variety=v, canvas_width=w, canvas_height=h)).render_frame(s)
+                    for v, s, (w, h) in requests]
+        for workers in (1, 2, 4, 8):
+            self.assertEqual(render_batch(requests, max_workers=workers), expected)
+    
+    def test_engine_config_is_frozen_copy(self):
+        from dataclasses import FrozenInstanceError
+        config = PotatoConfig(variety='procedural', variety_params={'seed': 1},
+                              compare_varieties=['russet'])
+        engine = AnimationEngine(config)
+        fingerprint = engine.cache_fingerprint()
+        config.variety_params['seed'] = 2
+        config.compare_varieties.append('red')
+        config.canvas_width = 10
+        self.assertEqual(engine.config.variety_params, {'seed': 1})
+        self.assertEqual(engine.config.compare_varieties, ('russet',))
+        self.assertEqual(engine.config.canvas_width, 40)
+        with self.assertRaises(FrozenInstanceError):
+            engine.config.canvas_width = 10
+        with self.assertRaises(TypeError):
+            engine.config.variety_params['seed'] = 2
+        self.assertEqual(engine.cache_fingerprint(), fingerprint)
+        self.assertEqual(replace(engine.config, canvas_width=10).canvas_width, 10)
+
+
+class TestGrowthScheduler(unittest.TestCase):
+    def test_only_due_plants_advance(self):
+        config = PotatoConfig(growth_speed=1.0, canvas_width=16)
+        scheduler = GrowthScheduler(config, [Plant('red'), Plant('red', planted_at=0.5),
+                                             Plant('red', planted_at=10.0)])
+        self.assertEqual(scheduler.next_event_time(), 0.5)
+        changed = scheduler.advance(1.0)
+        self.assertEqual(changed, {0: GrowthStage.SEED, 1: None})
+        self.assertEqual(scheduler.stage_of(0), GrowthStage.GERMINATION)
+        self.assertEqual(scheduler.stage_of(1), GrowthStage.SEED)
+        self.assertEqual(sorted(scheduler.advance(1.6)), [1])
+        self.assertIsNone(scheduler.stage_of(2))
+    
+    def test_stage_durations(self):
+        config = PotatoConfig(growth_speed=2.0)
+        plant = Plant('russet', durations={GrowthStage.SEED: 0.25})
+        scheduler = GrowthScheduler(config, [plant])
+        self.assertEqual(scheduler.next_event_time(), 0.25)
+        
+        scheduler.advance(100.0)
+        self.assertEqual(scheduler.stage_of(0), GrowthStage.HARVEST_READY)
+        self.assertIsNone(scheduler.next_event_time())
+        
+        russet = get_variety('russet')
+        expected = 0.25 + sum(russet.get_duration(s) * 2.0 for s in list(GrowthStage)[1:-1])
+        timeline = GrowthScheduler(config, [Plant('russet', durations={GrowthStage.SEED: 0.25})])
+        last = None
+        while timeline.next_event_time() is not None:
+            last = timeline.next_event_time()
+            timeline.advance(last)
+        self.assertAlmostEqual(last, expected)
+    
+    def test_dirty_segments_rebuild_frame(self):
+        config = PotatoConfig(growth_speed=1.0, canvas_width=18)
+        scheduler = GrowthScheduler.staggered(config, ['russet', 'yukon_gold', 'fingerling'], 0.7)
+        rows = scheduler.render().split('\n')
+        now = 0.0
+        while scheduler.next_event_time() is not None:
+            now = scheduler.next_event_time()
+            for plant_id, previous in scheduler.advance(now).items():
+                for row, col, text in scheduler.dirty_segments(plant_id, previous):
+                    rows[row] = rows[row][:col] + text + rows[row][col + len(text):]
+            self.assertEqual('\n'.join(rows), scheduler.render())
+    
+    def test_unplanted_plants_are_bare_soil(self):
+        config = PotatoConfig(growth_speed=1.0, canvas_width=16, output_format='ndjson')
+        scheduler = GrowthScheduler.staggered(config, ['russet', 'red'], 100.0)
+        self.assertIsNone(scheduler.stage_of(1))
+        soil = scheduler.field.background
+        for row, line in enumerate(scheduler.render().split('\n')):
+            self.assertEqual(line[17:], soil[row][17:])
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with SimulationStore(os.path.join(tmpdir, 'state.db')) as store:
+                scheduler.attach_store(store, 'f')
+                out = io.StringIO()
+                scheduler.animate(stream=out, clock=None)
+                frames = [json.loads(line) for line in out.getvalue().splitlines()]
+                self.assertEqual(store.history('f', 1)[0], ('seed', 100.0, 101.0))
+        unplanted = [f['t'] for f in frames if f['stages'][1] is None]
+        self.assertLess(max(unplanted), 100.0)
+        self.assertEqual([f for f in frames if f['t'] == 100.0][0]['stages'],
+                         ['harvest_ready', 'seed'])
+    
+    def test_ndjson_follows_transitions(self):
+        config = PotatoConfig(growth_speed=1.0, canvas_width=16, output_format='ndjson')
+        scheduler = GrowthScheduler.staggered(config, ['russet', 'red'], 0.5)
+        out = io.StringIO()
+        scheduler.animate(stream=out, clock=None)
+        frames = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(frames[0]['stages'], ['seed', None])
+        self.assertEqual(frames[1]['t'], 0.5)
+        self.assertEqual(frames[1]['stages'], ['seed', 'seed'])
+        self.assertEqual(frames[2]['t'], 1.0)
+        self.assertEqual(frames[2]['stages'], ['germination', 'seed'])
+        self.assertEqual(frames[2]['stage'], 'seed')
+        self.assertEqual(frames[-1]['stages'], ['harvest_ready'] * 2)
+        self.assertEqual([f['t'] for f in frames], sorted(f['t'] for f in frames))
+    
+    def test_file_output_and_unsupported_formats(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'field.txt')
+            config = PotatoConfig(growth_speed=1.0, canvas_width=16, output_format='file',
+                                  output_file=filename)
+            GrowthScheduler.staggered(config, ['russet', 'red'], 0.5).animate()
+            with open(filename) as f:
+                text = f.read()
+            self.assertIn('t=0.00s: Seed, Unplanted', text)
+            self.assertIn('t=0.50s: Seed, Seed', text)
+            self.assertIn('t=1.00s: Germination, Seed', text)
+            self.assertIn('Harvest_Ready, Harvest_Ready', text)
+        
+        for output_format in ('svg', 'html'):
+            scheduler = GrowthScheduler.staggered(
+                PotatoConfig(output_format=output_format), ['russet', 'red'], 0.5)
+            with self.assertRaises(ValueError):
+                scheduler.animate()
+
+
+class TestSimulationStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'state.db')
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+    
+    def test_plants_at_matches_scan(self):
+        stages = [stage.value for stage in GrowthStage]
+        spans = []
+        with SimulationStore(self.path, batch_size=7) as store:
+            store.start_run('r')
+            for plant_id in range(40):
+                t = plant_id * 0.5
+                for stage in stages[:plant_id % len(stages) + 1]:
+                    store.record_transition('r', plant_id, stage, t)
+                    spans.append((plant_id, stage, t))
+                    t += 1.0 + plant_id % 3
+            for t in (0.0, 3.25, 7.0, 12.5, 40.0):
+                expected = []
+                for plant_id in range(40):
+                    current = [stage for p, stage, start in spans if p == plant_id and start <= t]
+                    if current and current[-1] == 'flowering':
+                        expected.append(plant_id)
+                self.assertEqual(store.plants_at('r', GrowthStage.FLOWERING, t), expected)
+    
+    def test_history_and_resume(self):
+        with SimulationStore(self.path) as store:
+            store.start_run('r')
+            store.record_transition('r', 0, 'seed', 0.0)
+            store.record_transition('r', 0, 'germination', 1.0)
+            store.checkpoint('r', 1.5, {'t': 1.5})
+            store.record_transition('r', 0, 'sprouting', 2.0)
+            self.assertEqual(store.history('r', 0),
+                             [('seed', 0.0, 1.0), ('germination', 1.0, 2.0), ('sprouting', 2.0, None)])
+        
+        with SimulationStore(self.path) as store:
+            self.assertEqual(store.resume('r'), {'t': 1.5})
+            self.assertEqual(store.history('r', 0), [('seed', 0.0, 1.0), ('germination', 1.0, None)])
+            self.assertEqual(store.plants_at('r', 'germination', 5.0), [0])
+            store.record_transition('r', 0, 'sprouting', 2.5)
+            self.assertEqual(store.history('r', 0)[-2:],
+                             [('germination', 1.0, 2.5), ('sprouting', 2.5, None)])
+            self.assertIsNone(store.resume('other'))
+    
+    def test_scheduler_resumes_from_checkpoint(self):
+        config = PotatoConfig(growth_speed=1.0, canvas_width=16)
+        with SimulationStore(self.path) as store:
+            scheduler = GrowthScheduler.staggered(config, ['russet', 'red'], 0.5)
+            self.assertFalse(scheduler.attach_store(store, 'field'))
+            scheduler.advance(2.2)
+            scheduler.checkpoint()
+            scheduler.advance(4.0)  # lost in the "crash"
+            expected = [scheduler.stage_of(i) for i in range(2)]
+        
+        with SimulationStore(self.path) as store:
+            scheduler = GrowthScheduler.staggered(config, ['russet', 'red'], 0.5)
+            self.assertTrue(scheduler.attach_store(store, 'field'))
+            self.assertEqual(scheduler.now, 2.2)
+            self.assertEqual(scheduler.stage_of(0), GrowthStage.SPROUTING)
+            scheduler.advance(4.0)
+            self.assertEqual([scheduler.stage_of(i) for i in range(2)], expected)
+            for plant_id in range(2):
+                starts = [t for _, t, _ in store.history('field', plant_id)]
+                self.assertEqual(len(starts), len(set(starts)))
+                self.assertEqual(store.history('field', plant_id)[-1][0],
+                                 scheduler.stage_of(plant_id).value)
+    
+    def test_resume_keeps_spans_written_before_checkpoint(self):
+        config = PotatoConfig(growth_speed=1.0, canvas_width=16)
+        with SimulationStore(self.path) as store:
+            scheduler = GrowthScheduler.staggered(config, ['russet', 'red'], 5.0)
+            scheduler.attach_store(store, 'f')
+            scheduler.advance(3.0)  # crash before the next checkpoint
+        
+        with SimulationStore(self.path) as store:
+            scheduler = GrowthScheduler.staggered(config, ['russet', 'red'], 5.0)
+            self.assertTrue(scheduler.attach_store(store, 'f'))
+            for _ in scheduler.ticks(None):
+                pass
+            history = store.history('f', 1)
+            self.assertEqual(history[:2], [('seed', 5.0, 6.0), ('germination', 6.0, 7.0)])
+            self.assertEqual(len(history), len(GrowthStage))
+            self.assertEqual(store.plants_at('f', 'seed', 5.5), [1])
+    
+    def test_simulator_writes_selected_output(self):
+        filename = os.path.join(self.tmpdir, 'field.txt')
+        config = PotatoConfig(growth_speed=0.01, output_format='file', output_file=filename,
+                              state_store=self.path)
+        PotatoGrowthSimulator(config).run()
+        with open(filename) as f:
+            self.assertIn('Harvest_Ready', f.read())
+        with SimulationStore(self.path) as store:
+            self.assertEqual(len(store.history('default', 0)), len(GrowthStage))
+    
+    def test_resume_rejects_different_field(self):
+        from potato_store import RunMismatchError
+        config = PotatoConfig(growth_speed=1.0, canvas_width=16)
+        with SimulationStore(self.path) as store:
+            scheduler = GrowthScheduler.staggered(config, ['russet', 'red'], 0.5)
+            scheduler.attach_store(store, 'f')
+            scheduler.advance(2.2)
+            scheduler.checkpoint()
+        
+        with SimulationStore(self.path) as store:
+            for varieties, interval, speed in ((['fingerling', 'yukon_gold'], 0.5, 1.0),
+                                               (['russet', 'red'], 4.0, 1.0),
+                                               (['russet', 'red'], 0.5, 2.0)):
+                other = GrowthScheduler.staggered(replace(config, growth_speed=speed),
+                                                  varieties, interval)
+                with self.assertRaises(RunMismatchError):
+                    other.attach_store(store, 'f')
+                self.assertIsNone(other.store)
+            self.assertEqual(store.history('f', 1)[0], ('seed', 0.5, 1.5))
+            
+            same = GrowthScheduler.staggered(config, ['russet', 'red'], 0.5)
+            self.assertTrue(same.attach_store(store, 'f'))
+            self.assertFalse(GrowthScheduler.staggered(config, ['fingerling'], 0.0)
+                             .attach_store(store, 'g'))
+    
+    def test_run_checkpoints(self):
+        config = PotatoConfig(growth_speed=0.01, canvas_width=16)
+        scheduler = GrowthScheduler.staggered(config, ['russet'], 0.0)
+        with SimulationStore(self.path) as store:
+            scheduler.attach_store(store, 'run')
+            scheduler.run(stream=io.StringIO(), checkpoint_interval=0.0)
+            t, state = store.latest_checkpoint('run')
+            self.assertEqual(state['plants'][0][0], len(GrowthStage) - 1)
+            self.assertEqual(store.plants_at('run', GrowthStage.HARVEST_READY, t + 1.0), [0])
+
+
+class NullStream:
+    def write(self, data):
+        pass
+    
+    def flush(self):
+        pass
+    
+    def fileno(self):
+        raise io.UnsupportedOperation("fileno")
+
+
+class TestPotatoDaemon(unittest.TestCase):
+    def setUp(self):
+        fd, self.config_path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        self._write_config({"variety": "russet", "growth_speed": 0})
+    
+    def tearDown(self):
+        for path in (self.config_path, self.config_path + '.status'):
+            if os.path.exists(path):
+                os.unlink(path)
+    
+    def _write_config(self, data):
+        with open(self.config_path, 'w') as f:
+            json.dump(data, f)
+        # Force a visible mtime change even on coarse-grained filesystems
+        stamp = time.time() + getattr(self, '_bump', 0)
+        self._bump = getattr(self, '_bump', 0) + 1
+        os.utime(self.config_path, (stamp, stamp))
+    
+    def _daemon(self, **overrides):
+        from potato import load_config
+        config = load_config(self.config_path)
+        for key, value in overrides.items():
+            setattr(config, key, value)
+        return PotatoDaemon(config, self.config_path, overrides, stream=NullStream())
+    
+    def test_reload_rebuilds_only_when_rendering_changes(self):
+        daemon = self._daemon()
+        self.assertFalse(daemon.check_reload())
+        
+        self._write_config({"variety": "russet", "growth_speed": 0.5})
+        self.assertTrue(daemon.check_reload())
+        self.assertEqual(daemon.config.growth_speed, 0.5)
+        self.assertEqual(daemon.engine_builds, 1)
+        
+        self._write_config({"variety": "red", "growth_speed": 0.5})
+        self.assertTrue(daemon.check_reload())
+        self.assertEqual(daemon.engine.config.variety, "red")
+        self.assertEqual(daemon.engine_builds, 2)
+    
+    def test_reload_attaches_shared_cache(self):
+        daemon = self._daemon()
+        self.assertIsNone(daemon.engine.frame_cache)
+        self._write_config({"variety": "russet", "growth_speed": 0,
+                            "shared_cache": f"reload{os.getpid()}"})
+        self.assertTrue(daemon.check_reload())
+        self.assertEqual(daemon.engine_builds, 2)
+        self.assertIsNotNone(daemon.engine.frame_cache)
+    
+    def test_loop_rejects_file_outputs(self):
+        from unittest import mock
+        from potato import main
+        for output_format in ('file', 'both', 'svg', 'html'):
+            argv = ['potato.py', '--loop', '--cycles', '1', '-s', '0', '-o', output_format]
+            with mock.patch('sys.argv', argv), mock.patch('sys.stderr', io.StringIO()) as err:
+                with self.assertRaises(SystemExit):
+                    main()
+            self.assertIn('--loop supports --output terminal, ndjson', err.getvalue())
+    
+    def test_reload_keeps_streaming_format(self):
+        daemon = self._daemon()
+        self._write_config({"variety": "russet", "growth_speed": 0, "output_format": "file"})
+        with self.assertLogs('potato', level='WARNING'):
+            self.assertTrue(daemon.check_reload())
+        self.assertEqual(daemon.config.output_format, "terminal")
+        self.assertEqual(daemon.engine_builds, 1)
+    
+    def test_overrides_survive_reload(self):
+        daemon = self._daemon(canvas_width=30)
+        self._write_config({"variety": "fingerling", "canvas_width": 80, "growth_speed": 0})
+        daemon.check_reload()
+        self.assertEqual(daemon.config.canvas_width, 30)
+        self.assertEqual(daemon.config.variety, "fingerling")
+    
+    def test_status_file(self):
+        daemon = self._daemon(max_cycles=3, status_file=self.config_path + '.status')
+        daemon.run()
+        with open(self.config_path + '.status') as f:
+            status = json.load(f)
+        self.assertEqual(status["cycles"], 3)
+        self.assertGreater(status["rss_bytes"], 0)
+        self.assertIn("soil_rows", status["caches"])
+    
+    def test_soak_memory_stays_flat(self):
+        # Set POTATO_SOAK_CYCLES=100000 for a full soak
+        cycles = int(os.environ.get("POTATO_SOAK_CYCLES", "2000"))
+        warmup = min(1000, cycles // 10)
+        daemon = self._daemon(max_cycles=warmup)
+        daemon.run()
+        rss_before = current_rss_bytes()
+        caches_before = cache_sizes()
+        
+        daemon.config.max_cycles = cycles
+        daemon.run()
+        self.assertEqual(daemon.cycles, cycles)
+        self.assertEqual(cache_sizes(), caches_before)
+        self.assertLess(current_rss_bytes() - rss_before, 1024 * 1024)
 
 
 class TestFileExport(unittest.TestCase):
@@ -117,6 +701,351 @@ class TestFileExport(unittest.TestCase):
                 os.unlink(tmp_path)
 
 
+class CountingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+    
+    def write(self, data):
+        self.writes += 1
+        return super().write(data)
+
+
+class TestNdjsonOutput(unittest.TestCase):
+    def _replay(self, text):
+        frames = []
+        rows = None
+        for line in text.splitlines():
+            obj = json.loads(line)
+            if 'rows' in obj:
+                rows = list(obj['rows'])
+            else:
+                for index, row in obj['diff']:
+                    rows[index] = row
+            frames.append((obj, list(rows)))
+        return frames
+    
+    def test_stream_reconstructs_frames(self):
+        engine = AnimationEngine(PotatoConfig(variety='red', growth_speed=0.5))
+        out = io.StringIO()
+        engine.stream_ndjson(out)
+        frames = self._replay(out.getvalue())
+        self.assertEqual(len(frames), len(GrowthStage))
+        for i, (stage, (obj, rows)) in enumerate(zip(GrowthStage, frames)):
+            self.assertEqual(obj['seq'], i)
+            self.assertEqual(obj['stage'], stage.value)
+            self.assertEqual(obj['t'], i * 0.5)
+            self.assertEqual((obj['w'], obj['h']), (40, 20))
+            self.assertEqual(rows, engine.render_rows(stage))
+        self.assertTrue(any('diff' in obj for obj, _ in frames))
+    
+    def test_keyframes_and_batching(self):
+        engine = AnimationEngine(PotatoConfig())
+        out = CountingStream()
+        writer = NdjsonWriter(out, 40, 20, batch_size=10, keyframe_interval=5)
+        for i in range(30):
+            writer.write_frame(GrowthStage.SEED, i, engine.render_rows(GrowthStage.SEED))
+        writer.flush()
+        self.assertEqual(out.writes, 3)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        for obj in lines:
+            self.assertEqual('rows' in obj, obj['seq'] % 5 == 0)
+    
+    def test_daemon_streams_ndjson(self):
+        out = io.StringIO()
+        config = PotatoConfig(output_format='ndjson', max_cycles=3, growth_speed=1.0)
+        PotatoDaemon(config, stream=out).run()
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3 * len(GrowthStage))
+        self.assertEqual(json.loads(lines[-1])['t'], 3 * len(GrowthStage) - 1)
+
+
+class TestExport(unittest.TestCase):
+    def test_style_runs_merge_across_spaces(self):
+        runs = list(style_runs("  \\ | /  ~-~-"))
+        self.assertEqual(runs, [(2, "st", "\\ | /"), (9, "su", "~-~-")])
+    
+    def test_svg_is_well_formed(self):
+        import xml.etree.ElementTree as ET
+        engine = AnimationEngine(PotatoConfig())
+        out = io.StringIO()
+        export_animation_svg(engine, out)
+        root = ET.fromstring(out.getvalue())
+        groups = root.findall('{http://www.w3.org/2000/svg}g')
+        self.assertEqual(len(groups), len(GrowthStage))
+        
+        out = io.StringIO()
+        export_stage_svg(engine, GrowthStage.SEED, out)
+        ET.fromstring(out.getvalue())
+    
+    def test_large_animation_stays_compact(self):
+        engine = AnimationEngine(PotatoConfig(canvas_width=300, canvas_height=120))
+        for exporter in (export_animation_svg, export_animation_html):
+            out = io.StringIO()
+            exporter(engine, out)
+            self.assertLess(len(out.getvalue().encode('utf-8')), 500 * 1024)
+    
+    def test_html_contains_every_stage(self):
+        out = io.StringIO()
+        export_animation_html(AnimationEngine(PotatoConfig(variety='red')), out)
+        html = out.getvalue()
+        self.assertIn('@keyframes', html)
+        self.assertIn('.red-tu{', html)
+        for stage in GrowthStage:
+            self.assertIn(f"Growth Stage: {stage.value.title()}", html)
+    
+    def test_comparison_panels_keep_their_colors(self):
+        import re
+        engine = ComparisonEngine.for_varieties(PotatoConfig(canvas_width=20), ['russet', 'red'])
+        for exporter in (export_animation_svg, export_animation_html):
+            out = io.StringIO()
+            exporter(engine, out)
+            doc = out.getvalue()
+            self.assertIn('.russet-tu{', doc)
+            self.assertIn('.red-tu{', doc)
+        
+        out = io.StringIO()
+        export_stage_svg(engine, GrowthStage.MATURITY, out)
+        runs = re.findall(r'<text x="([\d.]+)"[^>]*class="(\w+)-', out.getvalue())
+        self.assertEqual({cls for _, cls in runs}, {'russet', 'red'})
+        for x, cls in runs:
+            self.assertEqual(cls, 'russet' if float(x) < engine.offsets[1] * 0.6 else 'red')
+
+
+class TestExportCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmpdir, 'cache')
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+    
+    def _engine(self, **fields):
+        config = PotatoConfig(export_cache_dir=self.cache_dir, **fields)
+        return AnimationEngine(config)
+    
+    def test_unchanged_export_is_not_rerendered(self):
+        out = os.path.join(self.tmpdir, 'growth.txt')
+        engine = self._engine(output_file=out)
+        engine.save_to_file()
+        with open(out) as f:
+            first = f.read()
+        
+        engine = self._engine(output_file=out)
+        engine.render_frame = None  # any render attempt would now fail
+        engine.save_to_file()
+        with open(out) as f:
+            self.assertEqual(f.read(), first)
+        
+        os.unlink(out)
+        engine.save_to_file()
+        with open(out) as f:
+            self.assertEqual(f.read(), first)
+    
+    def test_key_tracks_rendering_inputs(self):
+        base = self._engine().cache_fingerprint()
+        self.assertEqual(base, self._engine(output_file='elsewhere.txt').cache_fingerprint())
+        self.assertNotEqual(ExportCache.key(base, 'txt'),
+                            ExportCache.key(self._engine(variety='red').cache_fingerprint(), 'txt'))
+        self.assertNotEqual(ExportCache.key(base, 'txt'), ExportCache.key(base, 'svg'))
+    
+    def test_timing_only_keys_timed_exports(self):
+        base = self._engine()
+        for overrides in ({'growth_speed': 3.0}, {'output_format': 'both'}, {'show_colors': False}):
+            self.assertEqual(self._engine(**overrides).cache_fingerprint('txt'),
+                             base.cache_fingerprint('txt'))
+        self.assertNotEqual(self._engine(growth_speed=3.0).cache_fingerprint('svg'),
+                            base.cache_fingerprint('svg'))
+        self.assertEqual(self._engine(output_format='html').cache_fingerprint('svg'),
+                         base.cache_fingerprint('svg'))
+    
+    def test_force_rerenders(self):
+        out = os.path.join(self.tmpdir, 'growth.svg')
+        export_animation(self._engine(), 'svg', out)
+        engine = self._engine(force_export=True)
+        calls = []
+        original = engine.render_frame
+        engine.render_frame = lambda stage: calls.append(stage) or original(stage)
+        export_animation(engine, 'svg', out)
+        self.assertEqual(len(calls), len(GrowthStage))
+    
+    def test_lru_eviction(self):
+        cache = ExportCache(self.cache_dir)
+        src = os.path.join(self.tmpdir, 'artifact')
+        for i, key in enumerate(['a', 'b', 'c']):
+            with open(src, 'w') as f:
+                f.write(key * 100)
+            cache.store(key, src)
+            stamp = time.time() - 100 + i * 10
+            os.utime(cache.path(key), (stamp, stamp))
+        
+        # Touch 'a' so 'b' becomes the least recently used entry
+        self.assertTrue(cache.fetch('a', os.path.join(self.tmpdir, 'restored')))
+        cache.max_bytes = 250
+        cache.evict()
+        self.assertTrue(os.path.exists(cache.path('a')))
+        self.assertFalse(os.path.exists(cache.path('b')))
+        self.assertTrue(os.path.exists(cache.path('c')))
+
+
+def _shared_cache_worker(namespace, variety, queue):
+    from potato_shm import SharedFrameCache
+    cache = SharedFrameCache(namespace)
+    engine = AnimationEngine(PotatoConfig(variety=variety))
+    frames = []
+    for stage in GrowthStage:
+        with cache.get_frame(engine, stage) as view:
+            frames.append(str(view, 'utf-8'))
+    queue.put((cache.misses, frames))
+    cache.close()
+
+
+class TestSharedFrameCache(unittest.TestCase):
+    def setUp(self):
+        self.namespace = f"test{os.getpid()}"
+    
+    def test_frames_match_and_render_once(self):
+        from potato_shm import SharedFrameCache
+        cache = SharedFrameCache(self.namespace)
+        try:
+            engine = AnimationEngine(PotatoConfig(variety='red'))
+            for stage in GrowthStage:
+                with cache.get_frame(engine, stage) as view:
+                    self.assertEqual(str(view, 'utf-8'), engine.render_frame(stage))
+            self.assertEqual(cache.misses, len(GrowthStage))
+            
+            # A second engine of the same variety reuses every frame
+            other = AnimationEngine(PotatoConfig(variety='red', growth_speed=0.5))
+            for stage in GrowthStage:
+                cache.get_frame(other, stage).release()
+            self.assertEqual(cache.misses, len(GrowthStage))
+        finally:
+            cache.close()
+    
+    def test_other_processes_reuse_frames(self):
+        import multiprocessing
+        from potato_shm import SharedFrameCache
+        cache = SharedFrameCache(self.namespace)
+        try:
+            engine = AnimationEngine(PotatoConfig(variety='fingerling'))
+            for stage in GrowthStage:
+                cache.get_frame(engine, stage).release()
+            
+            queue = multiprocessing.Queue()
+            workers = [multiprocessing.Process(target=_shared_cache_worker,
+                                               args=(self.namespace, 'fingerling', queue))
+                       for _ in range(3)]
+            for w in workers:
+                w.start()
+            results = [queue.get(timeout=30) for _ in workers]
+            for w in workers:
+                w.join()
+            expected = [engine.render_frame(stage) for stage in GrowthStage]
+            for misses, frames in results:
+                self.assertEqual(misses, 0)
+                self.assertEqual(frames, expected)
+        finally:
+            cache.close()
+    
+    def test_dead_renderer_slot_is_reclaimed(self):
+        import multiprocessing
+        from potato_shm import SharedFrameCache, RENDERING
+        dead = multiprocessing.Process(target=time.sleep, args=(0,))
+        dead.start()
+        dead.join()
+        
+        cache = SharedFrameCache(self.namespace)
+        try:
+            engine = AnimationEngine(PotatoConfig())
+            key = cache.frame_key(engine, GrowthStage.SEED)
+            slot, _ = cache._find_slot(key)
+            cache._write_slot(slot, key, 7, dead.pid, 0, RENDERING)
+            with cache.get_frame(engine, GrowthStage.SEED) as view:
+                self.assertEqual(str(view, 'utf-8'), engine.render_frame(GrowthStage.SEED))
+            self.assertEqual(cache._read_slot(slot)[1], 8)
+        finally:
+            cache.close()
+    
+    def test_last_close_removes_segments(self):
+        from multiprocessing import shared_memory
+        from potato_shm import SharedFrameCache
+        cache = SharedFrameCache(self.namespace)
+        cache.get_frame(AnimationEngine(PotatoConfig()), GrowthStage.SEED).release()
+        index_name = cache._index_name()
+        cache.close()
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=index_name)
+    
+    def test_threads_share_stale_entry(self):
+        from potato_shm import SharedFrameCache
+        cache = SharedFrameCache(self.namespace)
+        try:
+            engine = AnimationEngine(PotatoConfig(variety='red'))
+            cache.get_frame(engine, GrowthStage.SEED).release()
+            key = cache.frame_key(engine, GrowthStage.SEED)
+            slot, generation, shm, length = cache._attached[key]
+            cache._attached[key] = (slot, generation - 1, shm, length)  # looks stale
+            
+            barrier = threading.Barrier(8)
+            errors = []
+            
+            def worker():
+                barrier.wait()
+                try:
+                    with cache.get_frame(engine, GrowthStage.SEED) as view:
+                        self.assertEqual(len(view), length)
+                except Exception as e:
+                    errors.append(e)
+            
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertEqual(errors, [])
+        finally:
+            cache.close()
+        cache.close()  # closing twice is harmless
+    
+    def test_terminal_frames_skip_decoding(self):
+        from potato_shm import shared_frame_cache
+        shared = AnimationEngine(PotatoConfig(variety='fingerling', shared_cache=self.namespace))
+        private = AnimationEngine(PotatoConfig(variety='fingerling'))
+        
+        outputs = []
+        try:
+            for engine in (shared, private):
+                out = io.TextIOWrapper(io.BytesIO(), encoding='utf-8')
+                pacer = FramePacer(out, 0.0, slow_write_threshold=float('inf'))
+                if engine is shared:
+                    pacer.write_frame = None  # decoded rows would go through here
+                for stage in GrowthStage:
+                    engine.write_terminal_frame(pacer, stage)
+                out.flush()
+                outputs.append(out.buffer.getvalue())
+            self.assertEqual(outputs[0], outputs[1])
+            
+            rows = []
+            pacer = FramePacer(io.StringIO(), 0.0)
+            pacer.write_frame = lambda r, keyframe=True: rows.append(r) or True
+            shared.write_terminal_frame(pacer, GrowthStage.FLOWERING)
+            self.assertEqual(rows, [private.terminal_rows(GrowthStage.FLOWERING)])
+        finally:
+            shared_frame_cache(self.namespace).close()
+    
+    def test_exit_leaves_tracker_quiet(self):
+        import subprocess
+        import sys
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'potato.py')
+        with tempfile.TemporaryDirectory() as tmpdir:
+            result = subprocess.run([sys.executable, script, '-o', 'ndjson',
+                                     '--shared-cache', self.namespace],
+                                    cwd=tmpdir, capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0)
+        self.assertNotIn('Traceback', result.stderr)
+        self.assertNotIn('leaked', result.stderr)
+
+
 class TestGrowthStages(unittest.TestCase):
     def test_all_stages_exist(self):
         expected_stages = [